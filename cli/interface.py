@@ -9,11 +9,13 @@ from .themes import theme
 from .commands import CommandHandler
 from config import SOVWREN_SYSTEM_PROMPT
 from llm.ollama_client import ollama_client
+from rag.embeddings import embedding_manager
 from rag.retriever import rag_retriever
 from scraper.web_scraper import web_scraper
 from core.database import db
 from core.calendar import calendar
 from core.session_manager import session_manager
+from core.startup_profile import startup_profiler
 
 class SovwrenCLI:
     def __init__(self):
@@ -31,10 +33,17 @@ class SovwrenCLI:
         theme.print_status("Initializing Sovwren...", "info")
 
         try:
+            # Load the embedding model in the background, overlapping the steps
+            # below, so the first question doesn't wait for a cold model
+            embedding_manager.start_warm_up()
+
             # Initialize components
-            await db.initialize()
-            await calendar.initialize()
-            await rag_retriever.initialize()
+            with startup_profiler.phase("database"):
+                await db.initialize()
+            with startup_profiler.phase("calendar"):
+                await calendar.initialize()
+            with startup_profiler.phase("RAG index"):
+                await rag_retriever.initialize()
 
             # Initialize or resume session
             if resume_session_id:
@@ -60,7 +69,8 @@ class SovwrenCLI:
                 self.session_id = await session_manager.create_session(self.llm_provider)
 
             # Discover available models using the configured LLM client
-            models = await self.llm_client.discover_models()
+            with startup_profiler.phase("LLM model discovery"):
+                models = await self.llm_client.discover_models()
             if not models:
                 provider_name = "LM Studio" if self.llm_provider == "lmstudio" else "Ollama"
                 theme.print_error(f"No {provider_name} models found. Please check your LLM provider setup.")
@@ -88,7 +98,9 @@ class SovwrenCLI:
             theme.print_banner()
         
         # Initialize components (with optional session resume)
-        if not await self.initialize(resume_session_id=resume_session_id):
+        initialized = await self.initialize(resume_session_id=resume_session_id)
+        startup_profiler.report()
+        if not initialized:
             return
         
         theme.print_separator()
@@ -46,6 +46,11 @@ MAX_CONTEXT_LENGTH = 2048  # Reduced from 4000 for better performance
 MAX_RETRIEVED_CHUNKS = 3  # Reduced from 5 to lighten RAG overhead
 CHUNK_SIZE = 512
 CHUNK_OVERLAP = 50
+# Diversity re-rank (maximal marginal relevance) of retrieved chunks: candidates are
+# over-fetched by this factor, then picked trading relevance (weight RAG_MMR_LAMBDA)
+# against similarity to chunks already picked. 1.0 disables the diversity term.
+RAG_MMR_LAMBDA = 0.7
+RAG_MMR_FETCH_FACTOR = 4
 
 # External RAG sources (paths outside workspace/ that should be indexed)
 # Each entry is a dict with 'path' and optional 'patterns' (defaults to *.md, *.txt)
@@ -54,10 +59,78 @@ RAG_EXTERNAL_SOURCES: list[dict] = [
     {"path": "C:/dev/Obsidian", "name": "Obsidian"},
 ]
 
+# Vector index settings
+# "auto" starts with an exact Flat index and migrates to VECTOR_ANN_TYPE once the
+# corpus reaches VECTOR_ANN_THRESHOLD vectors. "flat", "hnsw", "ivf_flat" and
+# "ivf_pq" pin the index type (IVF types stay Flat until there is enough to train on).
+VECTOR_INDEX_TYPE = os.environ.get("SOVWREN_VECTOR_INDEX", "auto")
+VECTOR_ANN_TYPE = "hnsw"
+VECTOR_ANN_THRESHOLD = 50000
+VECTOR_INDEX_PARAMS = {
+    "hnsw_m": 32,                # Graph degree: higher = better recall, more RAM
+    "hnsw_ef_construction": 80,  # Build-time beam width
+    "hnsw_ef_search": 64,        # Query-time beam width (recall vs latency)
+    "ivf_nlist": 0,              # Coarse clusters; 0 = 4 * sqrt(n)
+    "ivf_nprobe": 16,            # Clusters scanned per query (recall vs latency)
+    "pq_m": 48,                  # PQ sub-quantizers (must divide the dimension)
+    "pq_nbits": 8,               # Bits per PQ code
+}
+# Compressed vector storage: "none" (float32), "sq8" (int8 scalar, ~4x smaller) or
+# "pq" (product quantization, ~16x smaller). Applied once there is enough data to
+# train on. Compressed indexes fetch k * VECTOR_RERANK_FACTOR candidates and re-rank
+# them against the stored float vectors (1 disables re-ranking).
+VECTOR_QUANTIZATION = os.environ.get("SOVWREN_VECTOR_QUANTIZATION", "none")
+VECTOR_RERANK_FACTOR = 4
+# Index persistence: adds/removes go to an append-only delta log; a full index write
+# (checkpoint) runs in the background after this many logged vector changes.
+VECTOR_CHECKPOINT_INTERVAL = 1000
+VECTOR_DELTA_FSYNC = False  # fsync every delta record (survives power loss, slower)
+# Memory-map the saved index read-only so startup doesn't read it all into RAM and
+# the CLI and IDE share page cache. It is copied into RAM before the first write.
+VECTOR_INDEX_MMAP = True
+# Vectors whose local file was deleted are hidden from search at once and removed by a
+# background prune that starts this many seconds after startup, in batches of this size.
+VECTOR_PRUNE_DELAY = 5.0
+VECTOR_PRUNE_BATCH = 500
+# HNSW and IVF indexes can't drop vectors in place: removed ids stay hidden from search
+# until they make up this share of the index, then a background rebuild compacts it.
+VECTOR_REBUILD_DEAD_RATIO = 0.1
+# Two-stage retrieval: above this many chunks, hierarchical searches first pick the
+# best-matching documents by centroid, then search only those documents' chunks.
+VECTOR_DOC_INDEX_THRESHOLD = 20000
+VECTOR_DOC_CANDIDATES = 64
+# Documents whose centroids are recomputed per database read and lock round
+VECTOR_CENTROID_BATCH = 256
+
 # Performance settings
 MAX_MEMORY_MB = 2024
 EMBEDDING_BATCH_SIZE = 64
-VECTOR_CACHE_SIZE = 2000
+# Embedding backend: "torch" (default), "onnx" (ONNX Runtime; faster on CPU-only
+# machines, needs `pip install "sentence-transformers[onnx]"`) or "remote" (the local
+# Ollama / LM Studio server, see EMBEDDING_REMOTE_*). EMBEDDING_ONNX_FILE is
+# the export inside the model repo: the quint8 file is the int8 dynamically quantized
+# model, "" uses the full-precision onnx/model.onnx. Vectors stay compatible with an
+# index built by the torch backend (check with tools/check_embedding_parity.py).
+EMBEDDING_BACKEND = "torch"
+EMBEDDING_ONNX_FILE = "onnx/model_quint8_avx2.onnx"
+# Remote backend: no torch or sentence-transformers in-process. The model's vectors
+# must match the index dimension: Ollama's "all-minilm" is all-MiniLM-L6-v2 (384-d);
+# switching to another model needs a re-ingest.
+EMBEDDING_REMOTE_PROVIDER = os.environ.get("SOVWREN_EMBEDDING_PROVIDER", "ollama")  # or "lmstudio"
+EMBEDDING_REMOTE_MODEL = os.environ.get("SOVWREN_EMBEDDING_MODEL", "all-minilm")
+EMBEDDING_REMOTE_BATCH = 32  # Texts per HTTP request
+EMBEDDING_REMOTE_CONNECTIONS = 4  # Pooled keep-alive connections (concurrent requests)
+# Worker processes for bulk embedding (each loads its own model copy, ~100 MB for
+# MiniLM). 0 keeps everything in-process; set near the number of physical cores
+# to scale ingestion throughput with cores.
+EMBEDDING_WORKERS = 0
+# Concurrent encode calls are gathered this long and run through the model as one batch
+EMBEDDING_BATCH_WINDOW_MS = 5
+# Embeddings persist across restarts in their own SQLite file (least recently used
+# entries are evicted beyond the budget); set the budget to 0 to disable
+EMBEDDING_CACHE_PATH = DATA_DIR / "embedding_cache.db"
+EMBEDDING_DISK_CACHE_MB = 256
+VECTOR_CACHE_SIZE = 2000  # In-memory embedding cache (LRU) budget, in KB
 
 # CLI Theme settings
 THEMES = {
@@ -68,6 +68,19 @@ class Database:
             )
         """)
 
+        # Vector index id -> chunk mapping (chunk text is read from document_chunks;
+        # `text` is only set for vectors without a backing chunk row)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS vector_map (
+                vector_id INTEGER PRIMARY KEY,
+                chunk_id INTEGER,
+                document_id INTEGER,
+                metadata TEXT,
+                text TEXT,
+                added_at REAL
+            )
+        """)
+
         # Models tracking
         await db.execute("""
             CREATE TABLE IF NOT EXISTS models (
@@ -121,6 +134,7 @@ class Database:
         await db.execute("CREATE INDEX IF NOT EXISTS idx_conversations_session ON conversations(session_id)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_documents_url ON documents(url)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_chunks_document ON document_chunks(document_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_vector_map_document ON vector_map(document_id)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_active ON sessions(last_active DESC)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_protocol_events_session ON protocol_events(session_id)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_protocol_events_type ON protocol_events(event_type)")
@@ -164,6 +178,132 @@ class Database:
             await db.commit()
             return cursor.lastrowid
 
+    async def set_chunk_embeddings(self, embeddings: List[Tuple[int, bytes]]):
+        """Store raw embedding vectors as (chunk_id, blob) pairs"""
+        if not embeddings:
+            return
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany("""
+                UPDATE document_chunks SET embedding_vector = ? WHERE id = ?
+            """, [(blob, chunk_id) for chunk_id, blob in embeddings])
+
+            await db.commit()
+
+    async def get_chunk_embeddings(self, chunk_ids: List[int]) -> Dict[int, bytes]:
+        """Get stored embedding blobs keyed by chunk id (chunks without one are omitted)"""
+        results = {}
+        if not chunk_ids:
+            return results
+
+        async with aiosqlite.connect(self.db_path) as db:
+            # Stay well under SQLite's host parameter limit
+            for i in range(0, len(chunk_ids), 500):
+                batch = chunk_ids[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                cursor = await db.execute(f"""
+                    SELECT id, embedding_vector FROM document_chunks
+                    WHERE id IN ({placeholders}) AND embedding_vector IS NOT NULL
+                """, batch)
+
+                for chunk_id, blob in await cursor.fetchall():
+                    results[chunk_id] = blob
+
+        return results
+
+    # ==================== Vector Map ====================
+
+    async def add_vector_entries(self, entries: List[Dict]):
+        """Insert vector map rows (keys: vector_id, chunk_id, document_id, metadata, text, added_at)"""
+        if not entries:
+            return
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany("""
+                INSERT OR REPLACE INTO vector_map
+                    (vector_id, chunk_id, document_id, metadata, text, added_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (e['vector_id'], e.get('chunk_id'), e.get('document_id'),
+                 json.dumps(e.get('metadata') or {}, ensure_ascii=False),
+                 e.get('text'), e.get('added_at'))
+                for e in entries
+            ])
+
+            await db.commit()
+
+    async def update_vector_entries(self, entries: List[Dict]):
+        """Update chunk/document/metadata of existing vector map rows (text kept unless given)"""
+        if not entries:
+            return
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany("""
+                UPDATE vector_map
+                SET chunk_id = ?, document_id = ?, metadata = ?, text = COALESCE(?, text)
+                WHERE vector_id = ?
+            """, [
+                (e.get('chunk_id'), e.get('document_id'),
+                 json.dumps(e.get('metadata') or {}, ensure_ascii=False),
+                 e.get('text'), e['vector_id'])
+                for e in entries
+            ])
+
+            await db.commit()
+
+    async def delete_vector_entries(self, vector_ids: List[int]):
+        """Delete vector map rows by vector id"""
+        if not vector_ids:
+            return
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                "DELETE FROM vector_map WHERE vector_id = ?",
+                [(vector_id,) for vector_id in vector_ids]
+            )
+            await db.commit()
+
+    async def clear_vector_entries(self):
+        """Delete all vector map rows (used when the index is recreated)"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("DELETE FROM vector_map")
+            await db.commit()
+
+    async def get_vector_entries(self) -> List[Tuple[int, Dict, Optional[float]]]:
+        """Get (vector_id, metadata, added_at) for every mapped vector (text is not loaded)"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                SELECT vector_id, metadata, added_at FROM vector_map
+            """)
+
+            rows = await cursor.fetchall()
+            return [
+                (vector_id, json.loads(metadata) if metadata else {}, added_at)
+                for vector_id, metadata, added_at in rows
+            ]
+
+    async def get_vector_texts(self, vector_ids: List[int]) -> Dict[int, str]:
+        """Get chunk text for the given vector ids"""
+        results = {}
+        if not vector_ids:
+            return results
+
+        async with aiosqlite.connect(self.db_path) as db:
+            for i in range(0, len(vector_ids), 500):
+                batch = vector_ids[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                cursor = await db.execute(f"""
+                    SELECT vm.vector_id, COALESCE(dc.chunk_text, vm.text, '')
+                    FROM vector_map vm
+                    LEFT JOIN document_chunks dc ON dc.id = vm.chunk_id
+                    WHERE vm.vector_id IN ({placeholders})
+                """, batch)
+
+                for vector_id, text in await cursor.fetchall():
+                    results[vector_id] = text
+
+        return results
+
     async def get_recent_conversations(self, session_id: str, limit: int = 10) -> List[Dict]:
         """Get recent conversations for context"""
         async with aiosqlite.connect(self.db_path) as db:
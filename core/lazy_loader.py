@@ -1,5 +1,6 @@
 """Lazy loading manager for efficient resource usage"""
 import asyncio
+import sys
 import weakref
 from typing import Any, Callable, Dict, Optional, TypeVar, Generic
 import time
@@ -61,6 +62,33 @@ class LazyLoader(Generic[T]):
         self._resource = None
         self._loaded_at = None
 
+class LazyModule:
+    """Module stand-in that imports the real module on first attribute access.
+
+    `faiss = LazyModule("faiss")` keeps a heavy dependency out of startup; the
+    import happens the first time code touches e.g. `faiss.IndexFlatIP`.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            # Plain __import__ so --profile-startup sees deferred imports too
+            __import__(self._name)
+            module = sys.modules[self._name]
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__['_module'] is not None else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
+
 class ResourcePool:
     """Pool for managing reusable resources"""
     
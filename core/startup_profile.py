@@ -0,0 +1,105 @@
+"""Startup profiler behind `main.py --profile-startup` and `sovwren_ide.py --profile-startup`.
+
+Records how long every first-time import takes (self and inclusive time, like
+`python -X importtime`) and how long each named initialization phase takes,
+then prints both, slowest first. The CLI prints as soon as it is ready for
+input; the IDE stops recording when startup completes (`finish`) and prints
+once the Textual app has exited and the terminal is back.
+
+Phases are marked with `startup_profiler.phase(name)`, which costs nothing when
+profiling is off.
+"""
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.started = time.perf_counter()
+        self.total: Optional[float] = None  # Seconds to ready, set by `finish`
+        self.imports: Dict[str, Tuple[float, float]] = {}  # module -> (self, inclusive)
+        self.phases: List[Tuple[str, float]] = []
+        self._local = threading.local()  # Per-thread stack of child import time
+        self._original_import = None
+
+    def enable(self):
+        """Start recording imports; call before the imports worth measuring"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        module_name = name
+        if level:
+            try:
+                package = (globals or {}).get("__package__") or ""
+                module_name = importlib.util.resolve_name("." * level + name, package)
+            except (ImportError, ValueError):
+                pass
+        if module_name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.imports.setdefault(module_name, (elapsed - children, elapsed))
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time an initialization step"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def finish(self):
+        """Stop recording at the moment startup completes; `report` prints later"""
+        if not self.enabled:
+            return
+        builtins.__import__ = self._original_import
+        self.enabled = False
+        self.total = time.perf_counter() - self.started
+
+    def report(self, limit: int = 25):
+        """Print the report, stopping the recording first if it is still running"""
+        self.finish()
+        if self.total is None:
+            return
+
+        print(f"\nStartup profile: ready in {self.total * 1000:.0f} ms")
+        print("\nInitialization phases (slowest first):")
+        for name, seconds in sorted(self.phases, key=lambda p: -p[1]):
+            print(f"  {seconds * 1000:8.1f} ms  {name}")
+
+        imports = sorted(self.imports.items(), key=lambda item: -item[1][0])
+        import_total = sum(self_time for self_time, _ in self.imports.values())
+        print(f"\nImports: {len(imports)} modules, {import_total * 1000:.0f} ms "
+              f"(top {min(limit, len(imports))} by self time):")
+        print(f"  {'self ms':>8}  {'total ms':>8}  module")
+        for module, (self_time, inclusive) in imports[:limit]:
+            print(f"  {self_time * 1000:8.1f}  {inclusive * 1000:8.1f}  {module}")
+        print()
+
+
+# Global startup profiler
+startup_profiler = StartupProfiler()
@@ -37,10 +37,16 @@ import argparse
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from cli.interface import cli
+# Enabled before anything else is imported so the report covers every import
+from core.startup_profile import startup_profiler
+if "--profile-startup" in sys.argv:
+    startup_profiler.enable()
+
+# Heavy dependencies (torch, faiss, bs4) are imported on first use, and the CLI
+# (which pulls in the RAG stack) only once arguments are parsed
 from cli.themes import theme
 from core.lazy_loader import health_checker
-from config import OLLAMA_BASE_URL, LMSTUDIO_BASE_URL
+from config import EMBEDDING_BACKEND, OLLAMA_BASE_URL, LMSTUDIO_BASE_URL
 
 def parse_arguments():
     """Parse command line arguments"""
@@ -92,6 +98,12 @@ def parse_arguments():
         help="Enable debug mode"
     )
     
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print import and initialization times once startup completes"
+    )
+    
     parser.add_argument(
         "--version",
         action="version",
@@ -115,33 +127,21 @@ def parse_arguments():
     return parser.parse_args()
 
 def check_dependencies():
-    """Check if required dependencies are available"""
-    missing_deps = []
-    
-    try:
-        import torch
-    except ImportError:
-        missing_deps.append("torch")
-    
-    try:
-        import faiss
-    except ImportError:
-        missing_deps.append("faiss-cpu")
-    
-    try:
-        from sentence_transformers import SentenceTransformer
-    except ImportError:
-        missing_deps.append("sentence-transformers")
-    
-    try:
-        from rich.console import Console
-    except ImportError:
-        missing_deps.append("rich")
-    
-    try:
-        from bs4 import BeautifulSoup
-    except ImportError:
-        missing_deps.append("beautifulsoup4")
+    """Check if required dependencies are available (without importing them)"""
+    import importlib.util
+
+    required = [
+        ("faiss", "faiss-cpu"),
+        ("rich", "rich"),
+        ("bs4", "beautifulsoup4"),
+    ]
+    if EMBEDDING_BACKEND != "remote":
+        required += [("torch", "torch"), ("sentence_transformers", "sentence-transformers")]
+
+    missing_deps = [
+        package for module, package in required
+        if importlib.util.find_spec(module) is None
+    ]
     
     if missing_deps:
         print("Missing required dependencies:")
@@ -221,8 +221,12 @@ async def main():
     args = parse_arguments()
     
     # Check dependencies
-    if not check_dependencies():
-        sys.exit(1)
+    with startup_profiler.phase("dependency check"):
+        if not check_dependencies():
+            sys.exit(1)
+
+    with startup_profiler.phase("import cli"):
+        from cli.interface import cli
     
     # Set theme
     if args.theme:
@@ -235,7 +239,9 @@ async def main():
     # Check LLM provider connection based on mode
     if args.use_lmstudio:
         # Use LM Studio
-        if not await check_lmstudio_connection(args.lmstudio_url):
+        with startup_profiler.phase("LM Studio connection check"):
+            connected = await check_lmstudio_connection(args.lmstudio_url)
+        if not connected:
             theme.print_error("Cannot connect to LM Studio!")
             theme.print_info(f"Make sure LM Studio is running at {args.lmstudio_url}")
             theme.print_info("Start LM Studio and enable the local server")
@@ -257,7 +263,9 @@ async def main():
         cli.llm_provider = "lmstudio"
     else:
         # Use Ollama (default)
-        if not await check_ollama_connection(args.ollama_url):
+        with startup_profiler.phase("Ollama connection check"):
+            connected = await check_ollama_connection(args.ollama_url)
+        if not connected:
             theme.print_error("Cannot connect to Ollama!")
             theme.print_info(f"Make sure Ollama is running at {args.ollama_url}")
             theme.print_info("Install Ollama: https://ollama.ai")
@@ -280,7 +288,8 @@ async def main():
         cli.llm_provider = "ollama"
     
     # Setup health monitoring
-    await setup_health_monitoring()
+    with startup_profiler.phase("health monitoring"):
+        await setup_health_monitoring()
     
     # Enable debug mode if requested
     if args.debug:
@@ -0,0 +1,136 @@
+"""Append-only delta log for vector index persistence.
+
+Each batch of added or removed vectors is appended as one small binary record,
+so durability costs a buffered write instead of rewriting the whole `.index`
+file. A checkpoint (full index write) makes the records before it redundant;
+`truncate_before` then drops them. On startup the remaining records are
+replayed on top of the last checkpoint.
+
+Record layout (little endian):
+    op (1 byte: b"A" add / b"R" remove) | count (uint32) | dimension (uint32)
+    ids (int64 * count) | vectors (float32 * count * dimension, adds only)
+"""
+import os
+import struct
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+_HEADER = struct.Struct("<cII")
+
+
+class DeltaLog:
+    ADD = b"A"
+    REMOVE = b"R"
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self.pending = 0  # Ids logged since the last checkpoint
+        self._file = None
+
+    def _handle(self):
+        if self._file is None or self._file.closed:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "ab")
+        return self._file
+
+    def append_add(self, ids: np.ndarray, vectors: np.ndarray):
+        """Log vectors added under `ids`."""
+        self._append(self.ADD, ids, vectors)
+
+    def append_remove(self, ids: np.ndarray):
+        """Log ids removed from the index."""
+        self._append(self.REMOVE, ids, None)
+
+    def _append(self, op: bytes, ids: np.ndarray, vectors: Optional[np.ndarray]):
+        ids = np.ascontiguousarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+
+        dimension = 0 if vectors is None else vectors.shape[1]
+        parts = [_HEADER.pack(op, len(ids), dimension), ids.tobytes()]
+        if vectors is not None:
+            parts.append(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+
+        f = self._handle()
+        f.write(b"".join(parts))
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+        self.pending += len(ids)
+
+    def tell(self) -> int:
+        """Current end of the log; pass to `truncate_before` after a checkpoint."""
+        if self._file is not None and not self._file.closed:
+            return self._file.tell()
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def replay(self) -> List[Tuple[bytes, np.ndarray, Optional[np.ndarray]]]:
+        """Read all complete records. A torn tail from a crash mid-write is cut off."""
+        records, good_end = self._read_records(0)
+        if os.path.exists(self.path) and good_end < os.path.getsize(self.path):
+            print("Warning: Discarding incomplete record at the end of the vector delta log")
+            self.close()
+            with open(self.path, "r+b") as f:
+                f.truncate(good_end)
+
+        self.pending = sum(len(ids) for _, ids, _ in records)
+        return records
+
+    def _read_records(self, offset: int):
+        records = []
+        if not os.path.exists(self.path):
+            return records, 0
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+
+        pos = 0
+        while pos + _HEADER.size <= len(data):
+            op, count, dimension = _HEADER.unpack_from(data, pos)
+            ids_end = pos + _HEADER.size + count * 8
+            end = ids_end + count * dimension * 4
+            if op not in (self.ADD, self.REMOVE) or end > len(data):
+                break
+
+            ids = np.frombuffer(data, dtype=np.int64, count=count, offset=pos + _HEADER.size)
+            vectors = None
+            if op == self.ADD:
+                vectors = np.frombuffer(
+                    data, dtype=np.float32, count=count * dimension, offset=ids_end
+                ).reshape(count, dimension)
+            records.append((op, ids, vectors))
+            pos = end
+
+        return records, offset + pos
+
+    def truncate_before(self, offset: int):
+        """Drop records before `offset` (they are covered by a checkpoint)."""
+        self.close()
+        if not os.path.exists(self.path):
+            self.pending = 0
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            tail = f.read()
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(tail)
+        os.replace(tmp_path, self.path)
+
+        records, _ = self._read_records(0)
+        self.pending = sum(len(ids) for _, ids, _ in records)
+
+    def reset(self):
+        """Discard the whole log (the index was recreated)."""
+        self.truncate_before(self.tell())
+
+    def close(self):
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        self._file = None
@@ -0,0 +1,205 @@
+"""Embedding caches: a byte-bounded in-memory LRU and a persistent on-disk cache.
+
+Embeddings are keyed by SHA-256 of (model name, text), so keys are stable across
+processes (unlike Python's salted `hash()`) and a model change never returns
+another model's vectors. Vectors are stored as float16 blobs in their own SQLite
+file, next to a last-used timestamp; once the file holds more than its byte
+budget, the least recently used rows are deleted.
+
+EmbeddingDiskCache methods are synchronous and meant to run in a worker thread;
+one connection is shared behind a lock, which keeps lookups on the query path cheap (no
+per-call connection setup as with `core.database`).
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class LRUByteCache:
+    """In-memory LRU of embeddings bounded by total bytes; every operation is O(1)."""
+
+    ENTRY_OVERHEAD = 100  # Approximate per-entry cost of the key, dict slot and array header
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _cost(self, key: bytes, value: np.ndarray) -> int:
+        return len(key) + value.nbytes + self.ENTRY_OVERHEAD
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: bytes, value: np.ndarray):
+        # Own copy: a row view would keep its whole batch array alive, uncounted
+        value = np.array(value, dtype=np.float32, copy=True)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= self._cost(key, old)
+        cost = self._cost(key, value)
+        if cost > self.max_bytes:
+            return
+        self._entries[key] = value
+        self.bytes += cost
+        while self.bytes > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self.bytes -= self._cost(evicted_key, evicted)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_mb": self.bytes / 1024 / 1024,
+            "max_mb": self.max_bytes / 1024 / 1024,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class EmbeddingDiskCache:
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._row_bytes = 0  # Bytes per row (key + vector + overhead), from stored rows
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model_name: str, text: str) -> bytes:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).digest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key BLOB PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+            conn.commit()
+            self._rows = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            sample = conn.execute(
+                "SELECT length(key) + length(vector) FROM embeddings LIMIT 1"
+            ).fetchone()
+            if sample:
+                self._row_bytes = sample[0] + 16
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: List[bytes], dimension: int) -> Dict[bytes, np.ndarray]:
+        """Return cached float32 vectors for the keys found (and mark them used)."""
+        found = {}
+        if not keys:
+            return found
+
+        with self._lock:
+            conn = self._connect()
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    if len(blob) == dimension * 2:
+                        found[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            if found:
+                now = int(time.time())
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                conn.commit()
+        return found
+
+    def put_many(self, items: Dict[bytes, np.ndarray]):
+        """Store vectors, then evict least recently used rows beyond the byte budget."""
+        if not items:
+            return
+
+        now = int(time.time())
+        rows = [
+            (key, np.asarray(vector, dtype=np.float16).tobytes(), now)
+            for key, vector in items.items()
+        ]
+        with self._lock:
+            conn = self._connect()
+            # Same key means same model and text, so an existing row is already right
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._rows += conn.total_changes - before
+            self._row_bytes = len(rows[0][0]) + len(rows[0][1]) + 16
+
+            limit = self.max_bytes // self._row_bytes
+            if self._rows > limit:
+                # Trim an extra 10% so eviction doesn't run on every write
+                excess = self._rows - int(limit * 0.9)
+                conn.execute("""
+                    DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_used LIMIT ?
+                    )
+                """, (excess,))
+                self._rows -= excess
+            conn.commit()
+
+    def stats(self) -> Dict:
+        return {
+            "entries": self._rows,
+            "size_mb": self._rows * self._row_bytes / 1024 / 1024,
+            "max_mb": self.max_bytes / 1024 / 1024,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM embeddings")
+            conn.commit()
+            self._rows = 0
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
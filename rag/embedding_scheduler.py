@@ -0,0 +1,130 @@
+"""Micro-batching scheduler for embedding generation.
+
+Chat-turn queries, ingestion and reindexing all call `encode_text` on their own.
+Rather than each running its own small batch through the model, every text that
+missed the caches is queued here. A single worker waits a few milliseconds for
+more requests, then runs one batch (up to EMBEDDING_BATCH_SIZE texts) through the
+model (`encode_batch` is a coroutine; local models run in a worker thread).
+
+- Interactive texts (search queries) always fill a batch before bulk texts
+  (ingestion), so a query arriving mid-ingestion waits for at most the batch
+  already running.
+- Texts are keyed like the caches (see `EmbeddingDiskCache.key`). A text that
+  is already queued or encoding is not queued again; the second caller awaits
+  the first caller's future. If an interactive caller asks for a text that is
+  queued as bulk, the text moves up to the interactive queue.
+"""
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Dict, List
+
+import numpy as np
+
+INTERACTIVE = 0
+BULK = 1
+
+
+class EmbeddingScheduler:
+    def __init__(self, encode_batch: Callable[[List[str]], Awaitable[np.ndarray]],
+                 batch_size: int, window_ms: float):
+        self._encode_batch = encode_batch
+        self.batch_size = max(1, batch_size)
+        self.window = max(0.0, window_ms) / 1000
+        self._loop = None
+        self._queues = (deque(), deque())  # Indexed by priority
+        self._inflight: Dict[bytes, asyncio.Future] = {}
+        self._running = set()  # Keys in the batch being encoded
+        self._wake = None
+        self._worker = None
+        self.batches = 0
+        self.texts = 0
+        self.coalesced = 0  # Requests answered by an already queued or running text
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or a new event loop (the old one's futures are unusable)
+            self._loop = loop
+            self._queues = (deque(), deque())
+            self._inflight = {}
+            self._running = set()
+            self._wake = asyncio.Event()
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, keys: List[bytes], texts: List[str],
+                     priority: int = BULK) -> List[np.ndarray]:
+        """Queue texts for encoding and return their embeddings in order."""
+        self._ensure_worker()
+
+        futures = []
+        for key, text in zip(keys, texts):
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._loop.create_future()
+                self._inflight[key] = future
+                self._queues[priority].append((key, text, future))
+            else:
+                self.coalesced += 1
+                if priority == INTERACTIVE:
+                    # A duplicate entry is skipped once either copy is taken
+                    self._queues[INTERACTIVE].append((key, text, future))
+            futures.append(future)
+        self._wake.set()
+
+        # Shielded: a cancelled caller must not cancel a future other callers share
+        return list(await asyncio.gather(*(asyncio.shield(f) for f in futures)))
+
+    def _take_batch(self):
+        batch = []
+        for queue in self._queues:
+            while queue and len(batch) < self.batch_size:
+                key, text, future = queue.popleft()
+                if future.done() or key in self._running:
+                    continue
+                self._running.add(key)
+                batch.append((key, text, future))
+        return batch
+
+    def _pending(self) -> int:
+        return len(self._queues[INTERACTIVE]) + len(self._queues[BULK])
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            if self.window and self._pending() < self.batch_size:
+                await asyncio.sleep(self.window)
+
+            batch = self._take_batch()
+            if not self._pending():
+                self._wake.clear()
+            if not batch:
+                continue
+
+            keys = [key for key, _, _ in batch]
+            texts = [text for _, text, _ in batch]
+            try:
+                vectors = await self._encode_batch(texts)
+                for (_, _, future), vector in zip(batch, vectors):
+                    if not future.done():
+                        future.set_result(vector)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for key in keys:
+                    self._inflight.pop(key, None)
+                    self._running.discard(key)
+                self.batches += 1
+                self.texts += len(batch)
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch": self.texts / self.batches if self.batches else 0.0,
+            "coalesced": self.coalesced,
+            "queued": self._pending(),
+        }
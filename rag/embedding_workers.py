@@ -0,0 +1,90 @@
+"""Process pool for embedding generation across CPU cores.
+
+One in-process model spends much of a bulk ingest in tokenization and Python
+overhead, which the GIL keeps on a single core. With EMBEDDING_WORKERS > 0, each
+worker process holds its own model copy. Large batches are split into one shard
+per worker (dealt out by length, so the work is even), and every worker writes its
+vectors straight into a shared-memory block owned by the caller, so only the
+texts are pickled.
+
+Workers are spawned (not forked) so they never inherit the event loop or model
+threads, and torch's intra-op threads are divided between them to avoid
+oversubscribing the cores.
+"""
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List
+
+import numpy as np
+
+_model = None  # Set in each worker process by _init_worker
+
+
+def _init_worker(model_name: str, backend: str, onnx_file: str, threads: int):
+    global _model
+    import torch
+    torch.set_num_threads(threads)
+
+    from .embeddings import load_model
+    _model, _ = load_model(model_name, "cpu", backend, onnx_file)
+
+
+def _encode_into(texts: List[str], shm_name: str, row: int, dimension: int) -> int:
+    """Encode texts in a worker and write them into rows row.. of the shared block."""
+    from .embeddings import ENCODE_BATCH_SIZE
+    vectors = _model.encode(texts, convert_to_numpy=True, batch_size=ENCODE_BATCH_SIZE)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray((len(texts), dimension), dtype=np.float32, buffer=shm.buf,
+                         offset=row * dimension * 4)
+        out[:] = vectors
+        del out  # Release the buffer before closing
+    finally:
+        shm.close()
+    return len(texts)
+
+
+class EmbeddingWorkerPool:
+    def __init__(self, workers: int, model_name: str, backend: str = "torch",
+                 onnx_file: str = ""):
+        self.workers = workers
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, backend, onnx_file, threads),
+        )
+
+    def encode(self, texts: List[str], dimension: int) -> np.ndarray:
+        """Encode texts across the workers (blocking; call from a thread)."""
+        # Deal texts out in length order so every worker gets a similar mix of
+        # short and long ones (encode then sorts each shard by length again)
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        shards = [order[w::self.workers] for w in range(self.workers)]
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(texts) * dimension * 4))
+        try:
+            futures = []
+            row = 0
+            for shard in shards:
+                if len(shard):
+                    futures.append(self._executor.submit(
+                        _encode_into, [texts[i] for i in shard], shm.name, row, dimension
+                    ))
+                    row += len(shard)
+            for future in futures:
+                future.result()
+
+            block = np.ndarray((len(texts), dimension), dtype=np.float32, buffer=shm.buf)
+            vectors = np.empty_like(block)
+            vectors[np.concatenate(shards)] = block
+            del block  # Release the buffer before closing
+            return vectors
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
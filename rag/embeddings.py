@@ -1,96 +1,255 @@
 """Embeddings generation using BERT models"""
 import asyncio
 import numpy as np
-from typing import List, Optional, Union
-from sentence_transformers import SentenceTransformer
-import torch
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
 from functools import lru_cache
 import time
-from config import EMBEDDING_BATCH_SIZE, TIMEOUTS
+from config import (
+    EMBEDDING_BACKEND, EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_WINDOW_MS, EMBEDDING_ONNX_FILE,
+    EMBEDDING_REMOTE_MODEL, EMBEDDING_REMOTE_PROVIDER, EMBEDDING_WORKERS, TIMEOUTS,
+    EMBEDDING_CACHE_PATH, EMBEDDING_DISK_CACHE_MB, VECTOR_CACHE_SIZE,
+)
+from .embedding_cache import EmbeddingDiskCache, LRUByteCache
+from .embedding_scheduler import BULK, INTERACTIVE, EmbeddingScheduler
+from .remote_embeddings import RemoteEmbeddingClient, RemoteEmbeddingError
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+def load_model(model_name: str, device: str, backend: str = "torch",
+               onnx_file: str = "") -> Tuple["SentenceTransformer", str]:
+    """Load a model with the requested backend; returns (model, backend actually used)"""
+    # Imported here: the remote backend never needs torch in-process
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "onnx":
+        try:
+            model_kwargs = {"file_name": onnx_file} if onnx_file else None
+            return SentenceTransformer(
+                model_name, device=device, backend="onnx", model_kwargs=model_kwargs
+            ), backend
+        except Exception as e:
+            print(f"Warning: ONNX embedding backend unavailable ({e}), using torch")
+    return SentenceTransformer(model_name, device=device), "torch"
+
+# Mini-batch size for model.encode. encode sorts its input by length first, so each
+# mini-batch pads only to texts of similar length; a single call over the whole
+# scheduler batch would pad every text to the longest one.
+ENCODE_BATCH_SIZE = 32
 
 class EmbeddingManager:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", backend: str = EMBEDDING_BACKEND,
+                 onnx_file: str = EMBEDDING_ONNX_FILE):
         self.model_name = model_name
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self.remote_provider = EMBEDDING_REMOTE_PROVIDER
+        self.remote_model = EMBEDDING_REMOTE_MODEL
+        self.remote_url = None  # None uses the provider's base URL from config
         self._model = None
         self._device = None
-        self._embedding_cache = {}
-        self._max_cache_size = 1000
+        self._pool = None
+        self._load_lock = None  # Created on first use, inside the running loop
+        self._warm_task = None
+        self.warm = False  # True once a batch has run through the loaded model
+        self.warm_up_ms = None
+        self._embedding_cache = LRUByteCache(VECTOR_CACHE_SIZE * 1024)
+        # Survives restarts, so re-indexing unchanged text never re-runs the model
+        self._disk_cache = EmbeddingDiskCache(
+            str(EMBEDDING_CACHE_PATH), EMBEDDING_DISK_CACHE_MB * 1024 * 1024
+        ) if EMBEDDING_DISK_CACHE_MB > 0 else None
+        # All cache misses go through one queue, so concurrent callers share batches
+        self._scheduler = EmbeddingScheduler(
+            self._encode, EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_WINDOW_MS
+        )
 
     async def initialize(self):
         """Lazy initialization of the embedding model"""
         if self._model is None:
-            await self._load_model()
+            if self._load_lock is None:
+                self._load_lock = asyncio.Lock()
+            async with self._load_lock:
+                # The background warm-up may have loaded it while we waited
+                if self._model is None:
+                    await self._load_model()
+
+    @property
+    def state(self) -> str:
+        """'cold', 'warming', 'warm' or 'failed' (warm-up raised; loads again on use)"""
+        if self.warm:
+            return "warm"
+        if self._warm_task is not None:
+            if not self._warm_task.done():
+                return "warming"
+            return "failed"
+        return "cold"
+
+    async def warm_up(self):
+        """Load the model and run a dummy batch, so the first query doesn't pay for it"""
+        if self.warm:
+            return
+        start_time = time.time()
+        try:
+            await self.initialize()
+            # Straight to the model: the caches and scheduler stats stay untouched
+            await self._encode([
+                "warm-up",
+                "A longer warm-up sentence, so buffers for padded batches are allocated too.",
+            ])
+            self.warm_up_ms = int((time.time() - start_time) * 1000)
+        except Exception as e:
+            print(f"Warning: embedding model warm-up failed: {e}")
+
+    def start_warm_up(self) -> asyncio.Task:
+        """Run warm_up() in the background (once); returns the task"""
+        if self._warm_task is None:
+            self._warm_task = asyncio.get_event_loop().create_task(self.warm_up())
+        return self._warm_task
 
     async def _load_model(self):
         """Load the sentence transformer model"""
         loop = asyncio.get_event_loop()
+
+        if self.backend == "remote":
+            client = RemoteEmbeddingClient(self.remote_provider, self.remote_model, self.remote_url)
+            try:
+                await client.connect()
+                self._model = client
+                return
+            except RemoteEmbeddingError as e:
+                await client.close()
+                print(f"Warning: remote embedding backend unavailable ({e}), using torch")
+                self.backend = "torch"
         
         def _load():
+            import torch
+
             # Determine device
             device = 'cuda' if torch.cuda.is_available() else 'cpu'
             self._device = device
             
-            # Load model
-            model = SentenceTransformer(self.model_name, device=device)
+            model, self.backend = load_model(self.model_name, device, self.backend, self.onnx_file)
             return model
         
         # Run in thread pool to avoid blocking
         self._model = await loop.run_in_executor(None, _load)
 
+        if EMBEDDING_WORKERS > 0 and self._pool is None:
+            from .embedding_workers import EmbeddingWorkerPool
+
+            # Workers load their own model copy when first used
+            self._pool = EmbeddingWorkerPool(
+                EMBEDDING_WORKERS, self.model_name, self.backend, self.onnx_file
+            )
+            self._scheduler.batch_size = EMBEDDING_BATCH_SIZE * EMBEDDING_WORKERS
+
+    @property
+    def cache_name(self) -> str:
+        """Model identity for cache keys; quantized vectors never mix with torch ones"""
+        if self.backend == "remote":
+            return f"{self.remote_provider}:{self.remote_model}"
+        if self.backend == "onnx":
+            return f"{self.model_name}|onnx|{self.onnx_file or 'onnx/model.onnx'}"
+        return self.model_name
+
+    async def _encode(self, texts: List[str]) -> np.ndarray:
+        """Encode one scheduler batch"""
+        if isinstance(self._model, RemoteEmbeddingClient):
+            vectors = await self._model.embed(texts)
+        else:
+            loop = asyncio.get_event_loop()
+            vectors = await loop.run_in_executor(None, self._encode_batch, texts)
+        self.warm = True
+        return vectors
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Run one scheduler batch through the model (called in a worker thread)"""
+        # Full batches (ingestion) are sharded across worker processes; small ones
+        # (queries) stay in-process, where they don't pay the IPC round trip
+        if self._pool and len(texts) >= EMBEDDING_BATCH_SIZE:
+            try:
+                return self._pool.encode(texts, self.get_embedding_dimension())
+            except Exception as e:
+                print(f"Warning: embedding workers failed ({e}), encoding in-process")
+                self._pool.shutdown()
+                self._pool = None
+                self._scheduler.batch_size = EMBEDDING_BATCH_SIZE
+        return self._model.encode(texts, convert_to_numpy=True, batch_size=ENCODE_BATCH_SIZE)
+
     async def encode_text(self, text: Union[str, List[str]], 
-                         batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+                         batch_size: int = EMBEDDING_BATCH_SIZE,
+                         priority: int = BULK) -> np.ndarray:
         """
         Generate embeddings for text(s)
         Returns numpy array of embeddings
+
+        Texts missing from the caches are encoded by the shared scheduler; pass
+        priority=INTERACTIVE for queries a user is waiting on. batch_size is
+        kept for compatibility; batches are sized by EMBEDDING_BATCH_SIZE.
         """
         await self.initialize()
         
         if isinstance(text, str):
             text = [text]
         
-        # Check cache first
+        # Check cache first (keys are stable across processes; see EmbeddingDiskCache.key)
+        keys = [EmbeddingDiskCache.key(self.cache_name, t) for t in text]
         cached_embeddings = []
         uncached_texts = []
         uncached_indices = []
         
         for i, t in enumerate(text):
-            cache_key = hash(t)
-            if cache_key in self._embedding_cache:
-                cached_embeddings.append((i, self._embedding_cache[cache_key]))
+            cached = self._embedding_cache.get(keys[i])
+            if cached is not None:
+                cached_embeddings.append((i, cached))
             else:
                 uncached_texts.append(t)
                 uncached_indices.append(i)
         
+        # Then the persistent cache
+        if uncached_texts and self._disk_cache:
+            try:
+                loop = asyncio.get_event_loop()
+                stored = await loop.run_in_executor(
+                    None, self._disk_cache.get_many,
+                    list({keys[i] for i in uncached_indices}), self.get_embedding_dimension()
+                )
+            except Exception as e:
+                print(f"Warning: embedding cache read failed: {e}")
+                stored = {}
+            if stored:
+                remaining = [(i, t) for i, t in zip(uncached_indices, uncached_texts)
+                             if keys[i] not in stored]
+                for i in uncached_indices:
+                    if keys[i] in stored:
+                        self._embedding_cache.put(keys[i], stored[keys[i]])
+                        cached_embeddings.append((i, stored[keys[i]]))
+                uncached_indices = [i for i, _ in remaining]
+                uncached_texts = [t for _, t in remaining]
+        
         # Generate embeddings for uncached texts
         new_embeddings = []
         if uncached_texts:
             try:
                 start_time = time.time()
                 
-                # Process in batches
-                all_new_embeddings = []
-                for i in range(0, len(uncached_texts), batch_size):
-                    batch = uncached_texts[i:i + batch_size]
-                    
-                    # Run encoding in thread pool
-                    loop = asyncio.get_event_loop()
-                    batch_embeddings = await loop.run_in_executor(
-                        None, 
-                        lambda: self._model.encode(batch, convert_to_numpy=True)
-                    )
-                    all_new_embeddings.extend(batch_embeddings)
+                all_new_embeddings = await self._scheduler.submit(
+                    [keys[i] for i in uncached_indices], uncached_texts, priority
+                )
                 
                 # Cache new embeddings
                 for i, emb in enumerate(all_new_embeddings):
-                    cache_key = hash(uncached_texts[i])
-                    self._embedding_cache[cache_key] = emb
+                    self._embedding_cache.put(keys[uncached_indices[i]], emb)
                 
-                # Manage cache size
-                if len(self._embedding_cache) > self._max_cache_size:
-                    # Remove oldest entries (simple LRU approximation)
-                    items = list(self._embedding_cache.items())
-                    for key, _ in items[:len(items) - self._max_cache_size + 100]:
-                        del self._embedding_cache[key]
+                if self._disk_cache:
+                    try:
+                        loop = asyncio.get_event_loop()
+                        await loop.run_in_executor(None, self._disk_cache.put_many, {
+                            keys[idx]: all_new_embeddings[i]
+                            for i, idx in enumerate(uncached_indices)
+                        })
+                    except Exception as e:
+                        print(f"Warning: embedding cache write failed: {e}")
                 
                 new_embeddings = all_new_embeddings
                 
@@ -101,8 +260,7 @@ class EmbeddingManager:
             except Exception as e:
                 print(f"Error generating embeddings: {e}")
                 # Return zero embeddings as fallback
-                embedding_dim = 384  # Default for all-MiniLM-L6-v2
-                return np.zeros((len(text), embedding_dim))
+                return np.zeros((len(text), self.get_embedding_dimension()))
         
         # Combine cached and new embeddings in correct order
         final_embeddings = [None] * len(text)
@@ -128,13 +286,13 @@ class EmbeddingManager:
 
     def get_embedding_dimension(self) -> int:
         """Get the dimension of embeddings"""
-        if self._model:
+        if self._model and self._model.get_sentence_embedding_dimension():
             return self._model.get_sentence_embedding_dimension()
         return 384  # Default for all-MiniLM-L6-v2
 
     async def similarity(self, text1: str, text2: str) -> float:
         """Calculate cosine similarity between two texts"""
-        embeddings = await self.encode_text([text1, text2])
+        embeddings = await self.encode_text([text1, text2], priority=INTERACTIVE)
         
         # Calculate cosine similarity
         emb1, emb2 = embeddings[0], embeddings[1]
@@ -155,5 +313,21 @@ class EmbeddingManager:
         """Get current cache size"""
         return len(self._embedding_cache)
 
+    async def shutdown(self):
+        """Stop the embedding worker processes and close the remote session, if any"""
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+        if isinstance(self._model, RemoteEmbeddingClient):
+            await self._model.close()
+
+    def get_cache_stats(self) -> dict:
+        """Counters for the memory cache, the disk cache (if on) and the batch scheduler"""
+        stats = {'memory': self._embedding_cache.stats()}
+        if self._disk_cache:
+            stats['disk'] = self._disk_cache.stats()
+        stats['scheduler'] = self._scheduler.stats()
+        return stats
+
 # Global embedding manager
 embedding_manager = EmbeddingManager()
\ No newline at end of file
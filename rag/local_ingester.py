@@ -17,7 +17,7 @@ from datetime import datetime
 from .retriever import rag_retriever
 from .vector_store import vector_store
 from core.workspace_paths import find_repo_root
-from config import RAG_EXTERNAL_SOURCES
+from config import EMBEDDING_WORKERS, RAG_EXTERNAL_SOURCES
 
 
 class LocalIngester:
@@ -221,12 +221,23 @@ class LocalIngester:
 
         print(f"Found {len(files_to_ingest)} files to ingest...")
 
-        # Ingest files with progress
-        for i, file_path in enumerate(files_to_ingest):
-            if (i + 1) % 10 == 0:
-                print(f"  Progress: {i + 1}/{len(files_to_ingest)}")
+        # Ingest files with progress. With embedding workers, several files are in
+        # flight at once so their chunks fill batches big enough to shard.
+        semaphore = asyncio.Semaphore(max(1, EMBEDDING_WORKERS * 2))
+        done = 0
 
-            await self.ingest_file(file_path)
+        async def _ingest(file_path: Path):
+            nonlocal done
+            async with semaphore:
+                await self.ingest_file(file_path)
+            done += 1
+            if done % 10 == 0:
+                print(f"  Progress: {done}/{len(files_to_ingest)}")
+
+        await asyncio.gather(*(_ingest(file_path) for file_path in files_to_ingest))
+
+        # Files deleted since they were indexed stop showing up in search results
+        await vector_store.refresh_file_status()
 
         # Get final stats from vector store
         rag_stats = await rag_retriever.get_stats()
@@ -0,0 +1,122 @@
+"""Embedding backend that calls the local LLM server instead of loading a model.
+
+Users who already run Ollama or LM Studio for generation can embed through the
+server's batch endpoint and skip loading torch and sentence-transformers
+in-process (hundreds of MB of RAM, seconds of startup).
+
+    ollama:   POST {OLLAMA_BASE_URL}/api/embed       {"model", "input": [...]}
+    lmstudio: POST {LMSTUDIO_BASE_URL}/embeddings    {"model", "input": [...]} (OpenAI format)
+
+One aiohttp session is kept open, so requests reuse pooled keep-alive connections.
+Each scheduler batch is split into requests of EMBEDDING_REMOTE_BATCH texts,
+which are sent concurrently up to the connection limit.
+"""
+import asyncio
+from typing import List, Optional
+
+import aiohttp
+import numpy as np
+
+from config import (
+    EMBEDDING_REMOTE_BATCH, EMBEDDING_REMOTE_CONNECTIONS, LMSTUDIO_BASE_URL, OLLAMA_BASE_URL,
+    TIMEOUTS,
+)
+
+PROVIDERS = ("ollama", "lmstudio")
+
+
+class RemoteEmbeddingError(Exception):
+    """The embedding server could not be reached or returned an unusable response"""
+
+
+class RemoteEmbeddingClient:
+    def __init__(self, provider: str, model: str, base_url: Optional[str] = None,
+                 batch_size: int = EMBEDDING_REMOTE_BATCH,
+                 connections: int = EMBEDDING_REMOTE_CONNECTIONS,
+                 timeout: float = TIMEOUTS["embedding_generation"]):
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown embedding provider '{provider}' (expected one of {PROVIDERS})")
+        self.provider = provider
+        self.model = model
+        default_url = OLLAMA_BASE_URL if provider == "ollama" else LMSTUDIO_BASE_URL
+        self.base_url = (base_url or default_url).rstrip('/')
+        self.batch_size = max(1, batch_size)
+        self.connections = max(1, connections)
+        self.timeout = timeout
+        self.dimension = None
+        self.requests = 0
+        self.session = None
+
+    @property
+    def endpoint(self) -> str:
+        if self.provider == "ollama":
+            return f"{self.base_url}/api/embed"
+        return f"{self.base_url}/embeddings"
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            connector = aiohttp.TCPConnector(limit=self.connections)
+            self.session = aiohttp.ClientSession(timeout=timeout, connector=connector)
+        return self.session
+
+    async def connect(self) -> int:
+        """Check the server and learn the embedding dimension from a probe request"""
+        vectors = await self.embed(["dimension probe"])
+        self.dimension = vectors.shape[1]
+        return self.dimension
+
+    def get_sentence_embedding_dimension(self) -> Optional[int]:
+        return self.dimension
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in order, one request per batch_size texts"""
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = await asyncio.gather(*(self._request(batch) for batch in batches))
+        return np.concatenate(results).astype(np.float32, copy=False)
+
+    async def _request(self, texts: List[str]) -> np.ndarray:
+        session = self._get_session()
+        try:
+            async with session.post(self.endpoint, json={"model": self.model, "input": texts}) as response:
+                if response.status != 200:
+                    detail = (await response.text())[:200]
+                    raise RemoteEmbeddingError(
+                        f"{self.provider} embeddings returned HTTP {response.status}: {detail}"
+                    )
+                data = await response.json(content_type=None)
+        except asyncio.TimeoutError:
+            raise RemoteEmbeddingError(
+                f"{self.provider} embeddings timed out after {self.timeout}s "
+                f"at {self.endpoint}"
+            )
+        except aiohttp.ClientError as e:
+            raise RemoteEmbeddingError(f"{self.provider} embeddings unreachable at {self.endpoint}: {e}")
+        except ValueError as e:
+            raise RemoteEmbeddingError(f"{self.provider} embeddings returned invalid JSON: {e}")
+        if not isinstance(data, dict):
+            raise RemoteEmbeddingError(
+                f"{self.provider} embeddings returned {type(data).__name__}, expected a JSON object"
+            )
+        self.requests += 1
+
+        try:
+            if self.provider == "ollama":
+                vectors = data.get("embeddings") or []
+            else:
+                # OpenAI format; "index" gives each item's input position
+                items = sorted(data.get("data") or [], key=lambda item: item.get("index", 0))
+                vectors = [item.get("embedding") for item in items]
+            vectors = np.asarray(vectors, dtype=np.float32)
+        except (AttributeError, TypeError, ValueError) as e:
+            raise RemoteEmbeddingError(f"{self.provider} returned malformed embeddings: {e}")
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise RemoteEmbeddingError(
+                f"{self.provider} returned {len(vectors)} embeddings for {len(texts)} texts"
+            )
+        return vectors
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
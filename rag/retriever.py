@@ -4,7 +4,12 @@ from typing import List, Dict, Optional, Tuple
 import time
 import re
 
-from config import MAX_CONTEXT_LENGTH, MAX_RETRIEVED_CHUNKS, CHUNK_SIZE, CHUNK_OVERLAP, TIMEOUTS
+import numpy as np
+
+from config import (
+    MAX_CONTEXT_LENGTH, MAX_RETRIEVED_CHUNKS, CHUNK_SIZE, CHUNK_OVERLAP, TIMEOUTS,
+    RAG_MMR_LAMBDA, RAG_MMR_FETCH_FACTOR,
+)
 from .vector_store import vector_store
 from .embeddings import embedding_manager
 from core.database import db
@@ -20,7 +25,8 @@ class RAGRetriever:
         
         await db.initialize()
         await vector_store.initialize()
-        await embedding_manager.initialize()
+        # The model loads in the background; a query arriving first waits for it
+        embedding_manager.start_warm_up()
         
         self.initialized = True
 
@@ -54,9 +60,14 @@ class RAGRetriever:
             )
             chunk_ids.append(chunk_id)
         
-        # Add chunks to vector store
+        # Add chunks to vector store (filterable document fields ride along for search filters)
+        filter_fields = {
+            field: metadata[field] for field in vector_store.FILTERABLE_FIELDS
+            if field in metadata and field != 'document_id'
+        }
         chunk_metadata = [
             {
+                **filter_fields,
                 'document_id': document_id,
                 'chunk_index': i,
                 'chunk_id': chunk_ids[i],
@@ -113,9 +124,10 @@ class RAGRetriever:
         return [chunk for chunk in chunks if chunk.strip()]
 
     async def retrieve_context(self, query: str, session_id: str = None,
-                               debug: bool = False):
+                               debug: bool = False, filters: Dict = None):
         """Retrieve relevant context for a query.
 
+        `filters` limits the searched chunks by metadata, e.g. {"doc_type": "bookmark"}.
         If debug=True, returns (context, debug_info) tuple.
         Otherwise returns just the context string.
         """
@@ -129,8 +141,11 @@ class RAGRetriever:
             search_start = time.time()
             search_results = await vector_store.search(
                 query=query,
-                k=MAX_RETRIEVED_CHUNKS
+                k=MAX_RETRIEVED_CHUNKS * max(1, RAG_MMR_FETCH_FACTOR),
+                filters=filters,
+                hierarchical=True
             )
+            search_results = await self._mmr_rerank(search_results, MAX_RETRIEVED_CHUNKS)
             search_time = time.time() - search_start
 
             if debug:
@@ -187,6 +202,35 @@ class RAGRetriever:
                 return "", {'error': str(e)}
             return ""
 
+    async def _mmr_rerank(self, search_results: List[Tuple[str, float, Dict]],
+                          k: int) -> List[Tuple[str, float, Dict]]:
+        """Pick `k` results by maximal marginal relevance.
+
+        Each pick maximizes RAG_MMR_LAMBDA * relevance - (1 - RAG_MMR_LAMBDA) *
+        (highest similarity to an already picked chunk), so overlapping chunks of
+        one file don't fill every slot. Uses the stored chunk vectors; results
+        without one are never penalized.
+        """
+        if len(search_results) <= k or RAG_MMR_LAMBDA >= 1.0:
+            return search_results[:k]
+
+        vectors, _ = await vector_store.get_stored_vectors([meta for _, _, meta in search_results])
+        relevance = np.array([similarity for _, similarity, _ in search_results], dtype=np.float32)
+        pairwise = vectors @ vectors.T
+
+        picked = []
+        redundancy = np.zeros(len(search_results), dtype=np.float32)
+        available = np.ones(len(search_results), dtype=bool)
+        for _ in range(k):
+            scores = RAG_MMR_LAMBDA * relevance - (1 - RAG_MMR_LAMBDA) * redundancy
+            scores[~available] = -np.inf
+            best = int(np.argmax(scores))
+            picked.append(best)
+            available[best] = False
+            redundancy = np.maximum(redundancy, pairwise[best])
+
+        return [search_results[i] for i in picked]
+
     def _format_conversation_context(self, conversations: List[Dict]) -> str:
         """Format recent conversations into context"""
         context_parts = []
@@ -228,14 +272,16 @@ class RAGRetriever:
         
         return '\n\n'.join(context_parts)
 
-    async def search_documents(self, query: str, limit: int = 5) -> List[Dict]:
-        """Search for documents by content"""
+    async def search_documents(self, query: str, limit: int = 5,
+                               filters: Dict = None) -> List[Dict]:
+        """Search for documents by content, optionally filtered by metadata"""
         await self.initialize()
         
         # Try vector search first
-        search_results = await vector_store.search(query, k=limit)
+        search_results = await vector_store.search(query, k=limit, filters=filters,
+                                                   hierarchical=True)
         
-        if search_results:
+        if search_results or filters:
             # Group by document and return document info
             doc_results = {}
             for text, similarity, metadata in search_results:
@@ -273,12 +319,15 @@ class RAGRetriever:
         return {
             'vector_store': vector_stats,
             'embedding_cache_size': embedding_manager.get_cache_size(),
+            'embedding_cache': embedding_manager.get_cache_stats(),
+            'embedding_model': embedding_manager.state,
             'embedding_dimension': embedding_manager.get_embedding_dimension()
         }
 
     async def cleanup(self):
         """Cleanup RAG resources"""
         await vector_store.cleanup()
+        await embedding_manager.shutdown()
 
 # Global RAG retriever instance
 rag_retriever = RAGRetriever()
\ No newline at end of file
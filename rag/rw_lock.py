@@ -0,0 +1,55 @@
+"""Async readers-writer lock for the vector store.
+
+Any number of readers (searches) may hold the lock together; a writer (add,
+remove, rebuild, checkpoint truncation) holds it alone. Readers are preferred:
+a waiting writer does not stop new readers from entering, so an ingestion
+batch queued behind a search never delays the next chat turn's search. Writes
+are short (embedding happens before the lock is taken), so writers are not
+starved in practice.
+
+Usage:
+    async with lock.read(): ...
+    async with lock.write(): ...
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class RWLock:
+    def __init__(self):
+        self._cond = asyncio.Condition()
+        self._readers = 0
+        self._writer = False
+
+    @property
+    def readers(self) -> int:
+        return self._readers
+
+    @property
+    def writing(self) -> bool:
+        return self._writer
+
+    @asynccontextmanager
+    async def read(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: not self._writer)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @asynccontextmanager
+    async def write(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: not self._writer and not self._readers)
+            self._writer = True
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._writer = False
+                self._cond.notify_all()
@@ -1,38 +1,118 @@
 """FAISS-based vector store for efficient similarity search"""
 import asyncio
-import faiss
+import hashlib
+import itertools
 import numpy as np
 import os
 import json
-from typing import List, Tuple, Dict, Optional
+import tempfile
+from typing import Awaitable, Callable, List, Tuple, Dict, Optional
 from pathlib import Path
 import time
 
-from config import VECTOR_INDEX_PATH, TIMEOUTS, MAX_RETRIEVED_CHUNKS
+from config import (
+    VECTOR_INDEX_PATH, TIMEOUTS, MAX_RETRIEVED_CHUNKS,
+    VECTOR_INDEX_TYPE, VECTOR_ANN_TYPE, VECTOR_ANN_THRESHOLD, VECTOR_INDEX_PARAMS,
+    VECTOR_QUANTIZATION, VECTOR_RERANK_FACTOR,
+    VECTOR_CHECKPOINT_INTERVAL, VECTOR_DELTA_FSYNC, VECTOR_INDEX_MMAP,
+    VECTOR_PRUNE_DELAY, VECTOR_PRUNE_BATCH, VECTOR_REBUILD_DEAD_RATIO,
+    VECTOR_DOC_INDEX_THRESHOLD, VECTOR_DOC_CANDIDATES, VECTOR_CENTROID_BATCH,
+)
+from .delta_log import DeltaLog
+from .rw_lock import RWLock
 from .embeddings import embedding_manager
+from .embedding_scheduler import INTERACTIVE
+from core.database import db
+from core.lazy_loader import LazyModule
 from core.workspace_paths import find_repo_root
 
+faiss = LazyModule("faiss")  # Imported when the index is first loaded or built
+
 class VectorStore:
+    # Index types selectable via VECTOR_INDEX_TYPE; IVF types need training data first
+    INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+    # (index type, VECTOR_QUANTIZATION) -> compressed variant built by `_build_index`
+    QUANTIZED_KINDS = {
+        ("flat", "sq8"): "sq8",
+        ("flat", "pq"): "pq",
+        ("hnsw", "sq8"): "hnsw_sq8",
+        ("hnsw", "pq"): "hnsw_sq8",  # FAISS has no inner-product HNSW+PQ; use SQ8
+        ("ivf_flat", "sq8"): "ivf_sq8",
+        ("ivf_flat", "pq"): "ivf_pq",
+    }
+    UNQUANTIZED_KINDS = {"sq8": "flat", "pq": "flat", "hnsw_sq8": "hnsw", "ivf_sq8": "ivf_flat"}
+    # Kinds that store lossy codes and benefit from exact re-ranking
+    COMPRESSED_KINDS = ("sq8", "pq", "hnsw_sq8", "ivf_sq8", "ivf_pq")
+    # Kinds that can drop vectors in place. HNSW graphs cannot delete nodes, and IVF
+    # removal compacts the lists without IndexIDMap2 noticing (its id array then
+    # points at the wrong vectors), so those hide removed ids as dead until a rebuild.
+    REMOVABLE_KINDS = ("flat", "sq8", "pq")
+    # Metadata fields `search(filters=...)` can match on; id sets are kept per value
+    FILTERABLE_FIELDS = ("doc_type", "source_name", "file_type", "source", "document_id")
+
     def __init__(self, index_path: str = str(VECTOR_INDEX_PATH)):
         self.index_path = index_path
         self.index = None
+        self._index_mapped = False  # True while self.index is a read-only mmap view
         self.dimension = 384  # Default embedding dimension
-        self.document_map = {}  # Maps index positions to document info
+        self.document_map = {}  # Maps stable vector ids to document info
+        self._next_id = 0  # Next vector id to hand out (ids are never reused)
+        # field -> value -> vector ids, maintained with document_map
+        self._field_ids: Dict[str, Dict] = {field: {} for field in self.FILTERABLE_FIELDS}
+        self._hash_ids: Dict[str, int] = {}  # content hash -> vector id (see `_content_hash`)
+        self._filter_cache: Dict = {}  # filter key -> (mask, packed bitmap, selector)
+        self._repo_root: Optional[Path] = None  # file:// urls resolve against this; found once
+        self._file_exists: Dict[str, bool] = {}  # file:// url -> target existed when last checked
         self.is_initialized = False
-        self._lock = asyncio.Lock()
+        # Searches share the read side; anything touching index/map state takes the write side
+        self._lock = RWLock()
+        # Adds/removes since the last full index write; replayed on load
+        self._delta = DeltaLog(f"{index_path}.delta", fsync=VECTOR_DELTA_FSYNC)
+        self._checkpoint_task: Optional[asyncio.Task] = None
+        self._save_mutex = asyncio.Lock()  # One index write at a time (see `_save_index`)
+        # vector_map writes run after the write lock is released, in lock order
+        self._map_write_task: Optional[asyncio.Task] = None
+        self._unwritten_texts: Dict[int, str] = {}  # New vector id -> text until its row lands
+        # Ids hidden from search until the background prune removes them
+        self._tombstones: set = set()
+        # Ids that also reference live documents; the prune drops only their missing refs
+        self._stale_refs: set = set()
+        self._prune_task: Optional[asyncio.Task] = None
+        self._prune_cancelled = False
+        self._prune_busy = False
+        self.prune_progress: Optional[Tuple[int, int]] = None  # (removed, total) while pruning
+        # Rebuilds happen on a shadow index that is swapped in when ready (see `_rebuild_shadow`)
+        self.generation = 0  # Bumped on every swap
+        self._dead_ids: set = set()  # Unmapped ids an HNSW/IVF index still holds until its rebuild
+        self._rebuild_mutex = asyncio.Lock()  # One rebuild at a time
+        self._rebuild_journal: Optional[List] = None  # Changes made while a shadow is built
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._rebuild_pending: Optional[str] = None  # Kind to rebuild to ("" = current)
+        # Coarse index of per-document centroids (ids are document ids) for two-stage search
+        self._centroid_index = None
+        self._centroid_dirty: set = set()  # Documents whose centroid is missing or outdated
+        self._centroid_missing: set = set()  # Documents without stored vectors (no centroid)
+        self._centroid_task: Optional[asyncio.Task] = None
 
     async def initialize(self):
         """Initialize or load existing vector index"""
-        async with self._lock:
+        if self.is_initialized:
+            return  # Fast path: no lock once loaded
+        async with self._lock.write():
             if self.is_initialized:
-                return
+                return  # Another caller finished loading while we waited
             
             await self._load_or_create_index()
-            await self._prune_missing_file_urls()
+            stale = self._tombstone_missing_file_urls()
+            self._maybe_migrate_locked()
             self.is_initialized = True
 
-    @staticmethod
-    def _resolve_file_url(url: str) -> Path | None:
+        self._schedule_centroid_refresh()
+        if stale:
+            print(f"Found {stale} vector(s) for deleted local file(s); pruning in the background")
+            self.start_prune(delay=VECTOR_PRUNE_DELAY)
+
+    def _resolve_file_url(self, url: str) -> Path | None:
         if not url or not isinstance(url, str):
             return None
         if not url.startswith("file://"):
@@ -43,73 +123,509 @@ class VectorStore:
         if not rel:
             return None
 
-        repo_root = find_repo_root(Path(__file__))
-        return (repo_root / Path(rel)).resolve()
+        if self._repo_root is None:
+            self._repo_root = find_repo_root(Path(__file__))
+        return (self._repo_root / Path(rel)).resolve()
 
-    def _is_missing_file_url(self, metadata: Dict) -> bool:
-        """Return True if this metadata points to a missing local file."""
+    def _file_url_exists(self, url: str) -> bool:
+        """Stat the target of a `file://` url (True for anything else)."""
         try:
-            url = (metadata or {}).get("url", "")
             path = self._resolve_file_url(url)
-            if path is None:
-                return False
-            return not path.exists()
+            return path is None or path.exists()
         except Exception:
-            return False
+            return True
 
-    async def _prune_missing_file_urls(self) -> None:
-        """Drop vectors whose `file://...` source no longer exists by rebuilding the index."""
-        if not self.index or not self.document_map:
-            return
+    def _track_file_url(self, url: str):
+        """Record whether a newly mapped `file://` url exists (one stat per distinct url)."""
+        if isinstance(url, str) and url.startswith("file://") and url not in self._file_exists:
+            self._file_exists[url] = self._file_url_exists(url)
+
+    def _is_missing_ref(self, ref: Dict) -> bool:
+        """Return True if a document reference points at a missing local file.
 
-        stale_keys = [
-            idx
-            for idx, doc_info in self.document_map.items()
-            if self._is_missing_file_url(doc_info.get("metadata", {}))
+        Only consults `_file_exists`, so the search loop does no filesystem I/O;
+        `refresh_file_status` re-checks the files.
+        """
+        url = ref.get("url", "")
+        return isinstance(url, str) and self._file_exists.get(url) is False
+
+    def _is_missing_file_url(self, metadata: Dict) -> bool:
+        """Return True if every document this metadata references is a missing local file."""
+        return all(self._is_missing_ref(ref) for ref in self._refs(metadata or {}))
+
+    async def refresh_file_status(self, urls: Optional[List[str]] = None) -> int:
+        """Re-check whether indexed `file://` sources exist; return how many are missing.
+
+        Checks `urls`, or every tracked url when omitted. Ingestion calls this after a
+        scan so files deleted since startup drop out of search results.
+        """
+        urls = list(self._file_exists) if urls is None else [
+            url for url in urls if isinstance(url, str) and url.startswith("file://")
         ]
-        if not stale_keys:
-            return
+        if not urls:
+            return 0
+
+        loop = asyncio.get_event_loop()
+        status = await loop.run_in_executor(
+            None, lambda: {url: self._file_url_exists(url) for url in urls}
+        )
+        self._file_exists.update(status)
+        if self._tombstone_missing_file_urls():
+            self.start_prune()
+        return sum(1 for exists in status.values() if not exists)
 
-        remaining_texts: list[str] = []
-        remaining_metadata: list[dict] = []
+    def _tombstone_missing_file_urls(self) -> int:
+        """Mark vectors whose `file://...` sources no longer exist; return how many.
+
+        A vector whose references are all missing is hidden (tombstoned). One that
+        is shared with a live document stays searchable and is queued in
+        `_stale_refs` so the prune drops only the missing references. Only marks
+        them (no index work), so startup and searches are not held up;
+        `start_prune` does the rest later.
+        """
+        stale_ids = []
         for idx, doc_info in self.document_map.items():
-            if idx in stale_keys:
+            if idx in self._tombstones:
                 continue
-            remaining_texts.append(doc_info.get("text", ""))
-            remaining_metadata.append(doc_info.get("metadata", {}))
+            refs = self._refs(doc_info.get("metadata", {}))
+            missing = sum(1 for ref in refs if self._is_missing_ref(ref))
+            if missing == len(refs):
+                self._tombstones.add(idx)
+                self._stale_refs.discard(idx)
+                stale_ids.append(idx)
+            elif missing and idx not in self._stale_refs:
+                self._stale_refs.add(idx)
+                stale_ids.append(idx)
+        if stale_ids:
+            self._filter_cache.clear()
+        return len(stale_ids)
 
-        print(f"Pruning {len(stale_keys)} stale vector(s) for deleted local file(s)...")
+    def start_prune(self, delay: float = 0.0,
+                    on_progress: Optional[Callable[[int, int], None]] = None):
+        """Remove tombstoned vectors in a background task (no-op if one is running).
 
-        await embedding_manager.initialize()
-        self.dimension = embedding_manager.get_embedding_dimension()
-        self.index = faiss.IndexFlatIP(self.dimension)
-        self.document_map = {}
+        Work happens in batches of VECTOR_PRUNE_BATCH, taking the lock per batch so
+        searches and ingestion interleave. HNSW and IVF indexes only mark the ids
+        dead (see `_remove_ids`), so they take every tombstone in one batch.
+        `on_progress(removed, total)` is called after each batch; `prune_progress`
+        holds the same numbers. Missing references on shared vectors are dropped
+        first, in one step.
+        """
+        if not self._tombstones and not self._stale_refs:
+            return
+        if self._prune_task and not self._prune_task.done():
+            return
+        self._prune_cancelled = False
+        self._prune_task = asyncio.create_task(self._prune_tombstones(delay, on_progress))
+
+    async def cancel_prune(self):
+        """Stop the background prune after its current batch; remaining ids stay hidden."""
+        if self._prune_task and not self._prune_task.done():
+            self._prune_cancelled = True
+            if not self._prune_busy:
+                self._prune_task.cancel()  # Waiting (delay or lock): safe to interrupt
+            try:
+                await self._prune_task
+            except asyncio.CancelledError:
+                pass
+
+    async def _prune_tombstones(self, delay: float,
+                                on_progress: Optional[Callable[[int, int], None]]):
+        # A batch interrupted halfway would leave the index and the map out of step,
+        # so `cancel_prune` only interrupts while no batch is running (`_prune_busy`).
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+
+            if self._stale_refs and not self._prune_cancelled:
+                async with self._lock.write():
+                    self._drop_missing_refs()
+                await self._flush_map_writes()
+
+            total = len(self._tombstones)
+            removed = 0
+            while self._tombstones and not self._prune_cancelled:
+                async with self._lock.write():
+                    # HNSW/IVF removal only marks ids dead, so one call takes them all
+                    batch = sorted(self._tombstones)
+                    if self._index_kind(self.index) in self.REMOVABLE_KINDS:
+                        batch = batch[:VECTOR_PRUNE_BATCH]
+                    self._prune_busy = True
+                    try:
+                        await self._remove_ids(batch)
+                    finally:
+                        self._prune_busy = False
+
+                removed += len(batch)
+                total = max(total, removed + len(self._tombstones))
+                self.prune_progress = (removed, total)
+                if on_progress:
+                    on_progress(removed, total)
+                else:
+                    print(f"  Pruning stale vectors: {removed}/{total}")
+                await asyncio.sleep(0)
+
+            if removed:
+                print(f"Pruned {removed} stale vector(s)"
+                      + (" (cancelled)" if self._tombstones else ""))
+                self._schedule_checkpoint()
+        except Exception as e:
+            print(f"Error pruning stale vectors: {e}")
+        finally:
+            self.prune_progress = None
+
+    def _drop_missing_refs(self):
+        """Drop references to missing files from shared vectors, promoting a live one.
+
+        Caller holds the write lock; the rewritten rows are queued (see
+        `_queue_map_write`). A vector left with no live reference (its other files
+        went missing since it was marked) is tombstoned instead.
+        """
+        updated = {}
+        for idx in sorted(self._stale_refs):
+            doc_info = self.document_map.get(idx)
+            if doc_info is None or idx in self._tombstones:
+                continue
+            live = [ref for ref in self._refs(doc_info['metadata']) if not self._is_missing_ref(ref)]
+            if not live:
+                self._tombstones.add(idx)
+                self._filter_cache.clear()
+            elif len(live) < len(self._refs(doc_info['metadata'])):
+                updated[idx] = self._set_refs(idx, live)
+        self._stale_refs.clear()
+
+        self._queue_map_write(self._save_refs(updated))
+        if updated:
+            print(f"Dropped missing file references from {len(updated)} shared vector(s)")
+
+    def _set_refs(self, idx: int, refs: List[Dict]) -> Dict:
+        """Make refs[0] the vector's own metadata and the rest its shared refs.
 
-        if remaining_texts:
-            embeddings = await embedding_manager.encode_text(remaining_texts)
-            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-            zero_mask = norms == 0
-            if np.any(zero_mask):
-                norms = np.where(zero_mask, 1.0, norms)
-            embeddings = embeddings / norms
+        Returns the new metadata; the caller persists it (see `_save_refs`).
+        """
+        doc_info = self._unmap(idx)
+        primary = {key: value for key, value in refs[0].items() if key != 'refs'}
+        primary['content_hash'] = doc_info['metadata'].get('content_hash')
+        if refs[1:]:
+            primary['refs'] = [
+                {key: value for key, value in ref.items() if key not in ('refs', 'content_hash')}
+                for ref in refs[1:]
+            ]
+        doc_info['metadata'] = primary
+        self._map(idx, doc_info)
+        return primary
 
+    async def _save_refs(self, updated: Dict[int, Dict]):
+        """Persist metadata rewritten by `_set_refs`."""
+        if not updated:
+            return
+        # Chunk-less primaries keep their text in vector_map; carry it over
+        texts = await db.get_vector_texts([
+            idx for idx, meta in updated.items() if meta.get('chunk_id') is None
+        ])
+        await db.update_vector_entries([
+            self._vector_entry(idx, meta, texts.get(idx)) for idx, meta in updated.items()
+        ])
+
+    async def _add_entries(self, entries: List[Dict]):
+        """Insert vector_map rows for new vectors, then stop serving their texts from memory."""
+        try:
+            await db.add_vector_entries(entries)
+        finally:
+            for entry in entries:
+                self._unwritten_texts.pop(entry['vector_id'], None)
+
+    def _queue_map_write(self, write: Awaitable):
+        """Run a vector_map write once the write lock is released, after earlier ones.
+
+        Caller holds the write lock, so queued writes land in the order the map
+        changed. Searches see ids only through document_map (texts of rows not
+        written yet come from `_unwritten_texts`), and a crash before a row lands
+        just drops its unmapped vector on reload. Await `_flush_map_writes`
+        after releasing the lock.
+        """
+        previous = self._map_write_task
+
+        async def run():
+            if previous is not None:
+                await asyncio.wait([previous])
+            try:
+                await write
+            except Exception as e:
+                print(f"Error writing vector map: {e}")
+
+        self._map_write_task = asyncio.create_task(run())
+
+    async def _flush_map_writes(self):
+        """Wait until every queued vector_map write has landed."""
+        task = self._map_write_task
+        if task is not None:
+            await asyncio.wait([task])
+
+    async def _vector_texts(self, ids: List[int]) -> Dict[int, str]:
+        """Chunk text for vector ids, including new vectors whose rows are still queued."""
+        pending = {idx: self._unwritten_texts[idx] for idx in ids if idx in self._unwritten_texts}
+        texts = await db.get_vector_texts(ids)
+        for idx, text in pending.items():
+            texts.setdefault(idx, text)
+        return texts
+
+    async def _remove_ids(self, ids: List[int]) -> int:
+        """Remove vectors by id; other ids (and their map entries) stay valid.
+
+        Caller holds the write lock.
+        """
+        if not ids or not self.index:
+            return 0
+
+        id_array = np.asarray(sorted(set(ids)), dtype=np.int64)
+        id_list = id_array.tolist()
+
+        # Map rows go first: after a crash, unmapped vectors are dropped on load.
+        # Queued writes (maybe inserting these rows) must land before the delete.
+        await self._flush_map_writes()
+        await db.delete_vector_entries(id_list)
+        self._tombstones.difference_update(id_list)
+        self._stale_refs.difference_update(id_list)
+
+        if self._index_kind(self.index) not in self.REMOVABLE_KINDS:
+            # HNSW and IVF cannot remove in place: hide them now, rebuild once enough pile up
+            removed = sum(1 for idx in id_list if self._unmap(idx))
+            self._dead_ids.update(id_list)
+            self._filter_cache.clear()
+            self._maybe_compact()
+        else:
+            await self._ensure_writable()
             loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self.index.add, embeddings.astype(np.float32))
+            removed = await loop.run_in_executor(None, self.index.remove_ids, id_array)
+            for idx in id_list:
+                self._unmap(idx)
 
-            now = time.time()
-            for i, (text, meta) in enumerate(zip(remaining_texts, remaining_metadata)):
-                self.document_map[i] = {"text": text, "metadata": meta, "added_at": now}
+        self._delta.append_remove(id_array)
+        if self._rebuild_journal is not None:
+            self._rebuild_journal.append((DeltaLog.REMOVE, id_array, None))
+        return int(removed)
 
-        await self._save_index()
+    @staticmethod
+    def _refs(metadata: Dict) -> List[Dict]:
+        """All document references of a vector: its own metadata, then shared ones."""
+        return [metadata, *metadata.get('refs', ())]
+
+    @staticmethod
+    def _content_hash(text: str) -> str:
+        """Stable hash of a chunk with whitespace normalized; equal hashes share a vector."""
+        normalized = " ".join(text.split())
+        return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _map(self, idx: int, doc_info: Dict):
+        """Add a document_map entry and index its hash and filterable fields."""
+        self.document_map[idx] = doc_info
+        metadata = doc_info.get('metadata', {})
+        if metadata.get('content_hash'):
+            self._hash_ids[metadata['content_hash']] = idx
+        for ref in self._refs(metadata):
+            self._track_file_url(ref.get('url'))
+            self._centroid_dirty.add(ref.get('document_id'))
+            for field in self.FILTERABLE_FIELDS:
+                value = ref.get(field)
+                if isinstance(value, (str, int, float, bool)):
+                    self._field_ids[field].setdefault(value, set()).add(idx)
+        self._filter_cache.clear()
+
+    def _unmap(self, idx: int) -> Optional[Dict]:
+        """Drop a document_map entry and its index entries; return it if present."""
+        doc_info = self.document_map.pop(idx, None)
+        if doc_info is None:
+            return None
+        metadata = doc_info.get('metadata', {})
+        if self._hash_ids.get(metadata.get('content_hash')) == idx:
+            del self._hash_ids[metadata['content_hash']]
+        for ref in self._refs(metadata):
+            self._centroid_dirty.add(ref.get('document_id'))
+            for field in self.FILTERABLE_FIELDS:
+                ids = self._field_ids[field].get(ref.get(field))
+                if ids is not None:
+                    ids.discard(idx)
+                    if not ids:
+                        del self._field_ids[field][ref.get(field)]
+        self._filter_cache.clear()
+        return doc_info
+
+    def _reset_map(self, entries: Optional[Dict[int, Dict]] = None):
+        """Replace document_map wholesale and rebuild the field index."""
+        self.document_map = {}
+        self._field_ids = {field: {} for field in self.FILTERABLE_FIELDS}
+        self._hash_ids = {}
+        self._filter_cache.clear()
+        self._file_exists = {}
+        self._tombstones = set()
+        self._stale_refs = set()
+        self._dead_ids = set()
+        self._centroid_index = None
+        self._centroid_dirty = set()
+        self._centroid_missing = set()
+        for idx, doc_info in (entries or {}).items():
+            self._map(idx, doc_info)
+
+    def _filter_mask(self, filters: Dict,
+                     cache: bool = True) -> Tuple[np.ndarray, np.ndarray, "faiss.IDSelector"]:
+        """Return (bool mask over ids, packed bitmap, FAISS selector) for `filters`.
+
+        `filters` maps a field in FILTERABLE_FIELDS to a value or a list of values;
+        values of one field are OR-ed, fields are AND-ed. Tombstoned and dead ids
+        are always excluded. Results are cached until the document map changes, so
+        repeated filters cost nothing to set up; pass `cache=False` for one-off
+        filters (e.g. per-query document candidates).
+        """
+        key = tuple(sorted(
+            (field, tuple(value) if isinstance(value, (list, tuple, set)) else (value,))
+            for field, value in filters.items()
+        ))
+        cached = self._filter_cache.get(key)
+        if cached is not None:
+            return cached
+
+        mask = np.ones(self._next_id, dtype=bool)
+        for hidden in (self._tombstones, self._dead_ids):
+            if hidden:
+                mask[np.fromiter(hidden, dtype=np.int64, count=len(hidden))] = False
+        for field, values in key:
+            if field not in self._field_ids:
+                raise ValueError(
+                    f"cannot filter on '{field}' (filterable: {', '.join(self.FILTERABLE_FIELDS)})"
+                )
+            field_mask = np.zeros(self._next_id, dtype=bool)
+            for value in values:
+                ids = self._field_ids[field].get(value)
+                if ids:
+                    field_mask[np.fromiter(ids, dtype=np.int64, count=len(ids))] = True
+            mask &= field_mask
+
+        # IDSelectorBitmap reads bit (id & 7) of byte (id >> 3); the array must outlive it
+        packed = np.packbits(mask, bitorder="little")
+        selector = faiss.IDSelectorBitmap(len(packed), faiss.swig_ptr(packed))
+        cached = (mask, packed, selector)
+        if cache:
+            self._filter_cache[key] = cached
+        return cached
+
+    def _schedule_centroid_refresh(self):
+        """Bring document centroids up to date in the background (large corpora only)."""
+        if not self._centroid_dirty or not self.index:
+            return
+        if self.index.ntotal < VECTOR_DOC_INDEX_THRESHOLD:
+            return
+        if self._centroid_task and not self._centroid_task.done():
+            return
+        self._centroid_task = asyncio.create_task(self._refresh_centroids())
+
+    async def _refresh_centroids(self):
+        """Recompute centroids of dirty documents from their stored chunk vectors.
+
+        Documents are handled VECTOR_CENTROID_BATCH at a time (one database read
+        and one write-lock round each), so the first refresh of a large corpus
+        never holds every stored vector in memory at once.
+        """
+        try:
+            if self._centroid_index is not None and self._centroid_index.d != self.dimension:
+                self._centroid_index = None  # Embedding model changed: start over
+                self._centroid_dirty.update(self._field_ids['document_id'])
+
+            while self._centroid_dirty:
+                dirty = set(itertools.islice(self._centroid_dirty, VECTOR_CENTROID_BATCH))
+                self._centroid_dirty.difference_update(dirty)
+                dirty.discard(None)
+
+                chunk_ids: Dict[int, List[int]] = {}
+                for doc_id in dirty:
+                    for idx in self._field_ids['document_id'].get(doc_id, ()):
+                        refs = self._refs(self.document_map[idx]['metadata'])
+                        chunk_ids.setdefault(doc_id, []).extend(
+                            ref['chunk_id'] for ref in refs
+                            if ref.get('document_id') == doc_id and ref.get('chunk_id') is not None
+                        )
+                stored = await db.get_chunk_embeddings(
+                    [c for ids in chunk_ids.values() for c in ids]
+                )
+
+                dimension = self.dimension
+                doc_ids, centroids = [], []
+                for doc_id, ids in chunk_ids.items():
+                    blobs = [stored[c] for c in ids if len(stored.get(c, b"")) == dimension * 2]
+                    if blobs:
+                        vectors = np.frombuffer(b"".join(blobs), dtype=np.float16)
+                        vectors = vectors.reshape(-1, dimension).astype(np.float32)
+                        doc_ids.append(doc_id)
+                        centroids.append(vectors.mean(axis=0))
+
+                async with self._lock.write():
+                    index = self._centroid_index
+                    if index is None or index.d != dimension:
+                        index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+                    index.remove_ids(np.fromiter(
+                        (d for d in dirty if isinstance(d, int)), dtype=np.int64
+                    ))
+                    if doc_ids:
+                        index.add_with_ids(self._normalize(np.stack(centroids)),
+                                           np.asarray(doc_ids, dtype=np.int64))
+                    self._centroid_index = index
+                    self._centroid_missing.difference_update(dirty)
+                    self._centroid_missing.update(set(chunk_ids).difference(doc_ids))
+        except Exception as e:
+            print(f"Warning: could not update document centroids: {e}")
+
+    def _candidate_documents(self, query_embeddings: np.ndarray) -> Optional[List[int]]:
+        """Stage one of hierarchical search: documents whose centroid is closest.
+
+        Documents whose centroid is outdated or unavailable are always included
+        (their chunks may still match). Returns None when two-stage search does not
+        apply (small corpus or centroids not built yet).
+        """
+        index = self._centroid_index
+        if (index is None or not len(query_embeddings)
+                or self.index.ntotal < VECTOR_DOC_INDEX_THRESHOLD
+                or len(self._field_ids['document_id']) <= VECTOR_DOC_CANDIDATES):
+            return None
+
+        _, doc_ids = index.search(query_embeddings, min(VECTOR_DOC_CANDIDATES, index.ntotal))
+        candidates = set(doc_ids[doc_ids >= 0].tolist())
+        candidates.update(d for d in self._centroid_dirty if d is not None)
+        candidates.update(self._centroid_missing)
+        return sorted(candidates)
+
+    def _search_params(self, selector: "faiss.IDSelector") -> Optional["faiss.SearchParameters"]:
+        """Per-query parameters restricting the search to `selector`.
+
+        Returns None for index types that cannot filter inside the search (plain PQ).
+        """
+        kind = self._index_kind(self.index)
+        params = VECTOR_INDEX_PARAMS
+        if kind.startswith("ivf"):
+            return faiss.SearchParametersIVF(sel=selector, nprobe=params["ivf_nprobe"])
+        if kind.startswith("hnsw"):
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=params["hnsw_ef_search"])
+        if kind == "pq":
+            return None
+        return faiss.SearchParameters(sel=selector)
 
     async def _load_or_create_index(self):
         """Load existing index or create new one"""
+        await db.initialize()
+
         index_file = f"{self.index_path}.index"
-        map_file_json = f"{self.index_path}.map.json"
-        
+        if not os.path.exists(index_file):
+            await self._create_new_index()
+            return
+
+        # Maps used to be JSON files next to the index; migrate them once.
+        legacy_json_map = f"{self.index_path}.map.json"
+        if os.path.exists(legacy_json_map):
+            await self._load_index(index_file, legacy_json_map)
+            return
+
         # Security: do not load pickle maps. If an old `.map` exists, rebuild.
         legacy_pickle_map = f"{self.index_path}.map"
-        if os.path.exists(legacy_pickle_map) and not os.path.exists(map_file_json):
+        if os.path.exists(legacy_pickle_map) and not await db.get_vector_entries():
             print(
                 "Warning: Found legacy pickle map file; refusing to load it for safety. "
                 "Rebuilding vector index."
@@ -117,47 +633,349 @@ class VectorStore:
             await self._create_new_index()
             return
 
-        if os.path.exists(index_file) and os.path.exists(map_file_json):
-            await self._load_index(index_file, map_file_json)
-        else:
-            await self._create_new_index()
+        await self._load_index(index_file)
 
-    async def _load_index(self, index_file: str, map_file: str):
-        """Load existing FAISS index and document map"""
+    async def _load_index(self, index_file: str, legacy_json_map: Optional[str] = None):
+        """Load existing FAISS index and its document map"""
         try:
             loop = asyncio.get_event_loop()
             
             # Load index in thread pool
-            self.index = await loop.run_in_executor(
-                None, faiss.read_index, index_file
+            self.index, self._index_mapped = await loop.run_in_executor(
+                None, self._read_index, index_file
             )
             
-            # Load document map (JSON; safe to parse)
-            with open(map_file, 'r', encoding='utf-8') as f:
-                raw = json.load(f)
-                self.document_map = {int(k): v for k, v in raw.items()}
+            if legacy_json_map:
+                await self._migrate_json_map(legacy_json_map)
+            
+            self._reset_map({
+                vector_id: {'metadata': metadata, 'added_at': added_at}
+                for vector_id, metadata, added_at in await db.get_vector_entries()
+            })
             
             self.dimension = self.index.d
-            print(f"Loaded vector index with {self.index.ntotal} vectors")
+            self._apply_search_params(self.index)
+
+            if not isinstance(self.index, faiss.IndexIDMap2):
+                # Legacy index where ids were implicit positions: carry the stored
+                # vectors over into an id-mapped index (no re-embedding needed).
+                self.index = await loop.run_in_executor(
+                    None, self._wrap_positional_index, self.index
+                )
+                self._index_mapped = False
+
+            replayed = await loop.run_in_executor(None, self._replay_delta)
+            if replayed:
+                print(f"Replayed {replayed} vector change(s) from the delta log")
+
+            index_ids = await self._reconcile_map()
+            self._next_id = max(
+                max(self.document_map, default=-1),
+                max(index_ids, default=-1),
+            ) + 1
+            mapped = " (memory-mapped)" if self._index_mapped else ""
+            print(f"Loaded vector index with {self.index.ntotal} vectors{mapped}")
             
         except Exception as e:
             print(f"Error loading index: {e}")
             await self._create_new_index()
 
+    @staticmethod
+    def _read_index(index_file: str) -> Tuple["faiss.Index", bool]:
+        """Read an index, memory-mapping its vector codes when VECTOR_INDEX_MMAP is on.
+
+        A mapped index pages in on demand and shares the page cache with other
+        processes opening the same file, but must not be modified (see
+        `_make_writable`). Returns (index, mapped).
+        """
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+        if VECTOR_INDEX_MMAP and mmap_flag is not None:
+            try:
+                return faiss.read_index(index_file, mmap_flag | faiss.IO_FLAG_READ_ONLY), True
+            except RuntimeError as e:
+                print(f"Warning: could not memory-map vector index ({e}); loading into RAM")
+        return faiss.read_index(index_file), False
+
+    def _make_writable(self):
+        """Replace a memory-mapped index with an in-RAM copy before it is modified.
+
+        Writing to a mapped FAISS index aborts the process, so every mutation path
+        calls this (via `_ensure_writable`) first. The copy is made from the index
+        already in memory rather than re-read from disk. `faiss.clone_index` would
+        keep viewing the mapped codes, so it goes through an in-memory serialize.
+        """
+        if not self._index_mapped:
+            return
+        self.index = faiss.deserialize_index(faiss.serialize_index(self.index))
+        self._apply_search_params(self.index)
+        self._index_mapped = False
+
+    async def _ensure_writable(self):
+        if self._index_mapped:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self._make_writable)
+
+    def _replay_delta(self) -> int:
+        """Apply delta log records on top of the loaded checkpoint (runs in a worker thread).
+
+        Replay is idempotent: ids already in the index are not added twice. Removals
+        are skipped for kinds outside REMOVABLE_KINDS; map reconciliation hides those.
+        """
+        records = self._delta.replay()
+        if not records:
+            return 0
+        self._make_writable()
+
+        present = set(faiss.vector_to_array(self.index.id_map).tolist())
+        can_remove = self._index_kind(self.index) in self.REMOVABLE_KINDS
+
+        applied = 0
+        for op, ids, vectors in records:
+            if op == DeltaLog.ADD:
+                if vectors.shape[1] != self.index.d:
+                    continue
+                keep = [i for i, idx in enumerate(ids.tolist()) if idx not in present]
+                if keep:
+                    self.index.add_with_ids(vectors[keep], ids[keep])
+                    present.update(ids[keep].tolist())
+            elif can_remove:
+                self.index.remove_ids(ids)
+                present.difference_update(ids.tolist())
+            applied += len(ids)
+
+        return applied
+
+    async def _migrate_json_map(self, map_file: str):
+        """Import a legacy `.map.json` into the vector_map table, then set it aside."""
+        with open(map_file, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+
+        entries = []
+        for key, doc_info in raw.items():
+            meta = doc_info.get('metadata', {})
+            entries.append({
+                'vector_id': int(key),
+                'chunk_id': meta.get('chunk_id'),
+                'document_id': meta.get('document_id'),
+                'metadata': meta,
+                # Chunk text already lives in document_chunks when there is a chunk row
+                'text': None if meta.get('chunk_id') is not None else doc_info.get('text', ''),
+                'added_at': doc_info.get('added_at'),
+            })
+
+        await db.clear_vector_entries()
+        await db.add_vector_entries(entries)
+        os.replace(map_file, f"{map_file}.migrated")
+        print(f"Migrated {len(entries)} vector map entries from JSON to the database")
+
+    async def _reconcile_map(self) -> List[int]:
+        """Line the index up with the vector_map table after a load; return index ids.
+
+        Map rows whose vector never reached the saved index (crash between saves)
+        are re-added from persisted vectors; vectors without a map row are dropped.
+        """
+        index_ids = faiss.vector_to_array(self.index.id_map).tolist()
+        in_index = set(index_ids)
+        loop = asyncio.get_event_loop()
+
+        missing_rows = sorted(idx for idx in self.document_map if idx not in in_index)
+        if missing_rows:
+            await self._ensure_writable()
+            ids, vectors = await self._collect_vectors(
+                [(idx, self.document_map[idx]) for idx in missing_rows], self.index.d
+            )
+            await loop.run_in_executor(None, self.index.add_with_ids, vectors, ids)
+            index_ids.extend(missing_rows)
+
+        orphan_vectors = [idx for idx in index_ids if idx not in self.document_map]
+        if orphan_vectors:
+            await self._remove_ids(orphan_vectors)
+
+        if missing_rows or orphan_vectors:
+            print(f"Reconciled vector index: restored {len(missing_rows)} vector(s), "
+                  f"dropped {len(orphan_vectors)} unmapped vector(s)")
+
+        return index_ids
+
     async def _create_new_index(self):
         """Create new FAISS index"""
         # Initialize embedding manager to get dimension
         await embedding_manager.initialize()
         self.dimension = embedding_manager.get_embedding_dimension()
         
-        # Create FAISS index (using IndexFlatIP for cosine similarity)
-        self.index = faiss.IndexFlatIP(self.dimension)
-        self.document_map = {}
+        # Create FAISS index (inner product over normalized vectors = cosine similarity)
+        self.index = self._build_index(self._target_kind(0, "flat"), self.dimension)
+        self._index_mapped = False
+        self._reset_map()
+        self._next_id = 0
+        await db.clear_vector_entries()
+        self._delta.reset()
         
         print(f"Created new vector index with dimension {self.dimension}")
 
+    @classmethod
+    def _build_index(cls, kind: str, dimension: int, ids: Optional[np.ndarray] = None,
+                     vectors: Optional[np.ndarray] = None) -> "faiss.Index":
+        """Create an id-mapped index of `kind`, training it on `vectors` if needed.
+
+        Ids are stable across removals because the base index is wrapped in
+        IndexIDMap2. Callers must check `_min_train_size` before asking for a
+        trained (IVF or quantized) kind.
+        """
+        params = VECTOR_INDEX_PARAMS
+        metric = faiss.METRIC_INNER_PRODUCT
+        sq8 = faiss.ScalarQuantizer.QT_8bit
+        n = 0 if vectors is None else len(vectors)
+
+        if kind in ("hnsw", "hnsw_sq8"):
+            if kind == "hnsw_sq8":
+                base = faiss.IndexHNSWSQ(dimension, sq8, params["hnsw_m"], metric)
+            else:
+                base = faiss.IndexHNSWFlat(dimension, params["hnsw_m"], metric)
+            base.hnsw.efConstruction = params["hnsw_ef_construction"]
+        elif kind in ("ivf_flat", "ivf_sq8", "ivf_pq"):
+            quantizer = faiss.IndexFlatIP(dimension)
+            nlist = params["ivf_nlist"] or int(4 * np.sqrt(n))
+            nlist = max(1, min(nlist, n // 39))
+            if kind == "ivf_pq":
+                base = faiss.IndexIVFPQ(quantizer, dimension, nlist, cls._pq_m(dimension),
+                                        params["pq_nbits"], metric)
+            elif kind == "ivf_sq8":
+                base = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, sq8, metric)
+            else:
+                base = faiss.IndexIVFFlat(quantizer, dimension, nlist, metric)
+        elif kind == "sq8":
+            base = faiss.IndexScalarQuantizer(dimension, sq8, metric)
+        elif kind == "pq":
+            base = faiss.IndexPQ(dimension, cls._pq_m(dimension), params["pq_nbits"], metric)
+        else:
+            base = faiss.IndexFlatIP(dimension)
+
+        if not base.is_trained:
+            base.train(vectors)
+
+        index = faiss.IndexIDMap2(base)
+        cls._apply_search_params(index)
+        if n:
+            index.add_with_ids(vectors, ids)
+        return index
+
+    @staticmethod
+    def _pq_m(dimension: int) -> int:
+        """Largest PQ sub-quantizer count <= pq_m that divides the dimension."""
+        return next(m for m in range(min(VECTOR_INDEX_PARAMS["pq_m"], dimension), 0, -1)
+                    if dimension % m == 0)
+
+    @staticmethod
+    def _base_index(index: "faiss.Index") -> "faiss.Index":
+        """Return the concrete index under the id map."""
+        if isinstance(index, faiss.IndexIDMap2):
+            index = index.index
+        return faiss.downcast_index(index)
+
+    @classmethod
+    def _index_kind(cls, index: "faiss.Index") -> str:
+        base = cls._base_index(index)
+        if isinstance(base, faiss.IndexHNSW):
+            storage = faiss.downcast_index(base.storage)
+            return "hnsw_sq8" if isinstance(storage, faiss.IndexScalarQuantizer) else "hnsw"
+        if isinstance(base, faiss.IndexIVFPQ):
+            return "ivf_pq"
+        if isinstance(base, faiss.IndexIVFScalarQuantizer):
+            return "ivf_sq8"
+        if isinstance(base, faiss.IndexIVF):
+            return "ivf_flat"
+        if isinstance(base, faiss.IndexScalarQuantizer):
+            return "sq8"
+        if isinstance(base, faiss.IndexPQ):
+            return "pq"
+        return "flat"
+
+    @classmethod
+    def _apply_search_params(cls, index: "faiss.Index"):
+        """Set query-time recall/latency knobs from VECTOR_INDEX_PARAMS."""
+        base = cls._base_index(index)
+        if isinstance(base, faiss.IndexHNSW):
+            base.hnsw.efSearch = VECTOR_INDEX_PARAMS["hnsw_ef_search"]
+        elif isinstance(base, faiss.IndexIVF):
+            base.nprobe = VECTOR_INDEX_PARAMS["ivf_nprobe"]
+
+    @staticmethod
+    def _min_train_size(kind: str) -> int:
+        """Vectors required before an index of `kind` can be trained."""
+        if kind in ("pq", "ivf_pq"):
+            return 39 * 2 ** VECTOR_INDEX_PARAMS["pq_nbits"]
+        if kind in ("sq8", "hnsw_sq8", "ivf_flat", "ivf_sq8"):
+            return 1000
+        return 0
+
+    @classmethod
+    def _bytes_per_vector(cls, kind: str, dimension: int) -> float:
+        """Approximate resident bytes per vector for an index of `kind` (ids included)."""
+        params = VECTOR_INDEX_PARAMS
+        pq_bytes = cls._pq_m(dimension) * params["pq_nbits"] / 8
+        codes = {
+            "flat": 4 * dimension,
+            "hnsw": 4 * dimension + 8 * params["hnsw_m"],
+            "ivf_flat": 4 * dimension + 8,
+            "sq8": dimension,
+            "hnsw_sq8": dimension + 8 * params["hnsw_m"],
+            "ivf_sq8": dimension + 8,
+            "pq": pq_bytes,
+            "ivf_pq": pq_bytes + 8,
+        }
+        # IndexIDMap2 keeps the id array plus a reverse hash map
+        return codes.get(kind, 4 * dimension) + 8 + 32
+
+    def _target_kind(self, ntotal: int, current: str) -> str:
+        """Index type the configuration asks for at `ntotal` vectors."""
+        base = self.UNQUANTIZED_KINDS.get(current, current)
+        if VECTOR_INDEX_TYPE == "auto":
+            if base == "flat":
+                threshold = max(VECTOR_ANN_THRESHOLD, self._min_train_size(VECTOR_ANN_TYPE))
+                if ntotal >= threshold:
+                    base = VECTOR_ANN_TYPE
+            # Otherwise keep the current type: never demote automatically
+        else:
+            configured = VECTOR_INDEX_TYPE if VECTOR_INDEX_TYPE in self.INDEX_TYPES else "flat"
+            if configured != base:
+                base = configured if ntotal >= self._min_train_size(configured) else "flat"
+
+        quantized = self.QUANTIZED_KINDS.get((base, VECTOR_QUANTIZATION), base)
+        if quantized == current or ntotal >= self._min_train_size(quantized):
+            return quantized
+        return base
+
+    def _maybe_migrate_locked(self) -> bool:
+        """Queue a background migration to the configured index type if needed.
+
+        Caller holds the write lock. Returns True if a rebuild was queued.
+        """
+        if not self.index:
+            return False
+
+        current = self._index_kind(self.index)
+        target = self._target_kind(self.index.ntotal, current)
+        if target == current:
+            return False
+
+        self._schedule_rebuild(kind=target)
+        return True
+
+    @classmethod
+    def _wrap_positional_index(cls, index: "faiss.Index") -> "faiss.Index":
+        """Convert an index addressed by position into an id-mapped one (id == old position)."""
+        ids = np.arange(index.ntotal, dtype=np.int64)
+        vectors = index.reconstruct_n(0, index.ntotal) if index.ntotal else None
+        return cls._build_index("flat", index.d, ids, vectors)
+
     async def add_documents(self, texts: List[str], metadata: List[Dict]):
-        """Add documents to the vector store"""
+        """Add documents to the vector store.
+
+        Chunks are deduplicated by content hash: a chunk whose normalized text is
+        already indexed is not embedded again, it is recorded as another reference
+        (`metadata['refs']`) on the existing vector.
+        """
         await self.initialize()
         
         if not texts:
@@ -166,42 +984,354 @@ class VectorStore:
         start_time = time.time()
         
         try:
-            # Generate embeddings
-            embeddings = await embedding_manager.encode_text(texts)
+            hashes = [self._content_hash(text) for text in texts]
             
-            # Normalize embeddings for cosine similarity
-            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-            zero_mask = norms == 0
-            if np.any(zero_mask):
-                norms = np.where(zero_mask, 1.0, norms)
-                print(f"Warning: {int(np.sum(zero_mask))} zero-norm embedding(s); skipping normalization for those rows")
-            embeddings = embeddings / norms
+            vectors_by_hash = {}
+            while True:
+                # Embed only the first occurrence of content that is not indexed yet
+                first_rows: Dict[str, int] = {}
+                for i, content_hash in enumerate(hashes):
+                    if content_hash not in self._hash_ids and content_hash not in vectors_by_hash:
+                        first_rows.setdefault(content_hash, i)
+                if first_rows:
+                    vectors_by_hash.update(await self._embed_rows(
+                        texts, metadata, hashes, sorted(first_rows.values())
+                    ))
+                
+                async with self._lock.write():
+                    # Re-check: a vector this batch would share may have been removed
+                    # while we embedded (e.g. a renamed file's old url pruned), so its
+                    # content has to be embedded after all
+                    if any(h not in self._hash_ids and h not in vectors_by_hash for h in hashes):
+                        continue
+                    new_rows, shared, sources = await self._add_locked(
+                        texts, metadata, hashes, vectors_by_hash
+                    )
+                break
             
-            # Add to index
-            start_idx = self.index.ntotal
+            await self._flush_map_writes()
+            if shared:
+                await self._share_stored_embeddings(shared, sources)
+            self._schedule_checkpoint()
+            self._schedule_centroid_refresh()
             
+            elapsed = time.time() - start_time
+            deduped = f" ({len(texts) - len(new_rows)} duplicate chunk(s) shared)" if shared else ""
+            print(f"Added {len(texts)} documents in {elapsed:.2f}s{deduped}")
+            
+        except Exception as e:
+            print(f"Error adding documents: {e}")
+
+    async def _embed_rows(self, texts: List[str], metadata: List[Dict], hashes: List[str],
+                          rows: List[int]) -> Dict[str, np.ndarray]:
+        """Embed `rows` and return their normalized vectors keyed by content hash.
+
+        The raw vectors are stored for every chunk row sharing them, so later
+        rebuilds never need the model.
+        """
+        embeddings = await embedding_manager.encode_text([texts[i] for i in rows])
+        
+        # Normalize embeddings for cosine similarity
+        embeddings = self._normalize(embeddings, warn=True)
+        vectors_by_hash = {hashes[i]: embeddings[row] for row, i in enumerate(rows)}
+        
+        shared_rows = [i for i, h in enumerate(hashes) if h in vectors_by_hash]
+        await self._persist_embeddings(
+            [metadata[i] for i in shared_rows],
+            np.stack([vectors_by_hash[hashes[i]] for i in shared_rows])
+        )
+        return vectors_by_hash
+
+    async def _add_locked(self, texts: List[str], metadata: List[Dict], hashes: List[str],
+                          vectors_by_hash: Dict[str, np.ndarray]
+                          ) -> Tuple[List[int], Dict[int, Dict], Dict[int, List[int]]]:
+        """Index new content and add references for the rest; caller holds the write lock.
+
+        Every hash must be indexed already or be in `vectors_by_hash`; vector_map
+        rows are queued (see `_queue_map_write`). Returns (rows indexed as new
+        vectors, rewritten metadata of shared vectors, chunk ids that held each
+        shared vector before; see `_share_stored_embeddings`).
+        """
+        # Content indexed by a concurrent add meanwhile is shared instead
+        first_rows: Dict[str, int] = {}
+        for i, content_hash in enumerate(hashes):
+            if content_hash not in self._hash_ids:
+                first_rows.setdefault(content_hash, i)
+        new_rows = sorted(first_rows.values())
+        
+        for meta in metadata:
+            self._file_exists.pop(meta.get('url'), None)  # (Re-)ingested: stat again
+        now = time.time()
+        
+        if new_rows:
+            # Add to index under freshly allocated ids
+            start_id = self._next_id
+            ids = np.arange(start_id, start_id + len(new_rows), dtype=np.int64)
+            self._next_id += len(new_rows)
+            embeddings = np.stack([vectors_by_hash[hashes[i]] for i in new_rows])
+            
+            await self._ensure_writable()
             loop = asyncio.get_event_loop()
             await loop.run_in_executor(
-                None, self.index.add, embeddings.astype(np.float32)
+                None, self.index.add_with_ids, embeddings, ids
             )
+            self._delta.append_add(ids, embeddings)
+            if self._rebuild_journal is not None:
+                self._rebuild_journal.append((DeltaLog.ADD, ids, embeddings))
             
-            # Update document map
-            for i, meta in enumerate(metadata):
-                self.document_map[start_idx + i] = {
-                    'text': texts[i],
-                    'metadata': meta,
-                    'added_at': time.time()
-                }
-            
-            # Save index periodically
-            if self.index.ntotal % 100 == 0:
+            # Update document map (text stays on disk; see get_vector_texts)
+            entries = []
+            for idx, i in zip(ids.tolist(), new_rows):
+                meta = metadata[i]
+                meta['content_hash'] = hashes[i]
+                self._map(idx, {'metadata': meta, 'added_at': now})
+                self._unwritten_texts[idx] = texts[i]
+                entries.append(self._vector_entry(idx, meta, texts[i], now))
+            self._queue_map_write(self._add_entries(entries))
+        
+        # Every other chunk becomes a reference on the vector holding its content.
+        # Re-ingesting a file creates a new document row, so a reference to the
+        # same url and chunk position replaces the old one instead of piling up.
+        new_row_set = set(new_rows)
+        shared = {}
+        sources = {}  # vector id -> chunk ids that held it before this add
+        for i, content_hash in enumerate(hashes):
+            if i not in new_row_set:
+                idx = self._hash_ids[content_hash]
+                meta = metadata[i]
+                refs = self._refs(self.document_map[idx]['metadata'])
+                if idx not in sources:
+                    sources[idx] = [ref['chunk_id'] for ref in refs
+                                    if ref.get('chunk_id') is not None]
+                same = next((
+                    pos for pos, ref in enumerate(refs)
+                    if meta.get('url') and ref.get('url') == meta.get('url')
+                    and ref.get('chunk_index') == meta.get('chunk_index')
+                ), None)
+                if same is None:
+                    refs.append(meta)
+                else:
+                    refs[same] = meta
+                shared[idx] = self._set_refs(idx, refs)
+                if idx in self._tombstones and not self._is_missing_file_url(shared[idx]):
+                    # Hidden as stale, but this chunk is live again
+                    self._tombstones.discard(idx)
+                    self._filter_cache.clear()
+        self._queue_map_write(self._save_refs(shared))
+        
+        self._maybe_migrate_locked()
+        return new_rows, shared, sources
+
+    @staticmethod
+    def _vector_entry(idx: int, meta: Dict, text: Optional[str] = None,
+                      added_at: Optional[float] = None) -> Dict:
+        """vector_map row for `idx`; text is stored only when there is no chunk row."""
+        return {
+            'vector_id': idx,
+            'chunk_id': meta.get('chunk_id'),
+            'document_id': meta.get('document_id'),
+            'metadata': meta,
+            'text': text if meta.get('chunk_id') is None else None,
+            'added_at': added_at,
+        }
+
+    async def _share_stored_embeddings(self, shared: Dict[int, Dict],
+                                       sources: Dict[int, List[int]]):
+        """Copy each shared vector's stored embedding onto its chunk rows that lack it,
+        so any of them can become the vector's primary chunk later.
+
+        The embedding is read from the chunks that held the vector before this add
+        (`sources`): a re-ingested file replaces its old reference, so the new
+        primary's chunk row may have no embedding yet.
+        """
+        try:
+            stored = await db.get_chunk_embeddings(
+                sorted({chunk_id for chunk_ids in sources.values() for chunk_id in chunk_ids})
+            )
+            pairs = []
+            for idx, meta in shared.items():
+                blob = next((stored[c] for c in sources.get(idx, ()) if c in stored), None)
+                if blob is not None:
+                    pairs.extend(
+                        (ref['chunk_id'], blob) for ref in self._refs(meta)
+                        if ref.get('chunk_id') is not None and ref['chunk_id'] not in stored
+                    )
+            await db.set_chunk_embeddings(pairs)
+        except Exception as e:
+            print(f"Warning: could not share stored embeddings: {e}")
+
+    @staticmethod
+    def _normalize(embeddings: np.ndarray, warn: bool = False) -> np.ndarray:
+        """L2-normalize rows (zero rows are left as-is) so inner product == cosine."""
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        zero_mask = norms == 0
+        if np.any(zero_mask):
+            norms = np.where(zero_mask, 1.0, norms)
+            if warn:
+                print(f"Warning: {int(np.sum(zero_mask))} zero-norm embedding(s); skipping normalization for those rows")
+        return (embeddings / norms).astype(np.float32)
+
+    async def _persist_embeddings(self, metadata: List[Dict], embeddings: np.ndarray):
+        """Store chunk vectors (float16) in `document_chunks.embedding_vector`."""
+        pairs = [
+            (meta['chunk_id'], embeddings[i].astype(np.float16).tobytes())
+            for i, meta in enumerate(metadata)
+            if meta.get('chunk_id') is not None
+        ]
+        if not pairs:
+            return
+
+        try:
+            await db.initialize()
+            await db.set_chunk_embeddings(pairs)
+        except Exception as e:
+            print(f"Warning: could not persist chunk embeddings: {e}")
+
+    async def _collect_vectors(self, items: List[Tuple[int, Dict]],
+                               dimension: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (ids, vectors) for map entries, reading persisted vectors first.
+
+        Only entries without a stored vector of the right dimension are re-embedded
+        (their vectors are persisted afterwards, so this happens at most once).
+        """
+        ids = np.asarray([idx for idx, _ in items], dtype=np.int64)
+        vectors = np.zeros((len(items), dimension), dtype=np.float32)
+        if not items:
+            return ids, vectors
+
+        chunk_ids = [
+            doc_info['metadata'].get('chunk_id') for _, doc_info in items
+        ]
+        try:
+            await db.initialize()
+            stored = await db.get_chunk_embeddings([c for c in chunk_ids if c is not None])
+        except Exception as e:
+            print(f"Warning: could not read stored embeddings: {e}")
+            stored = {}
+
+        missing = []
+        for row, chunk_id in enumerate(chunk_ids):
+            blob = stored.get(chunk_id)
+            if blob is not None and len(blob) == dimension * 2:
+                vectors[row] = np.frombuffer(blob, dtype=np.float16)
+            else:
+                missing.append(row)
+
+        if missing:
+            print(f"Re-embedding {len(missing)} chunk(s) without a stored vector...")
+            stored_texts = await self._vector_texts([items[row][0] for row in missing])
+            texts = [stored_texts.get(items[row][0], '') for row in missing]
+            embeddings = self._normalize(await embedding_manager.encode_text(texts))
+            vectors[missing] = embeddings
+            await self._persist_embeddings(
+                [items[row][1]['metadata'] for row in missing], embeddings
+            )
+
+        return ids, vectors
+
+    async def rebuild_index(self, dimension: Optional[int] = None,
+                            index_type: Optional[str] = None):
+        """Rebuild the index from persisted vectors.
+
+        Pass `dimension` after an embedding model change; stored vectors of another
+        size are then re-embedded. `index_type` switches the index type (see
+        VECTOR_INDEX_TYPE); by default the current type is kept. Searches keep
+        running on the current index until the new one is swapped in.
+        """
+        await self.initialize()
+        await self._rebuild_shadow(kind=index_type, dimension=dimension)
+        await self._save_index()
+        print(f"Rebuilt vector index with {self.index.ntotal} vectors")
+
+    def _schedule_rebuild(self, kind: Optional[str] = None):
+        """Queue a background shadow rebuild, to `kind` or the current type."""
+        if kind or self._rebuild_pending is None:
+            self._rebuild_pending = kind or ""
+        if self._rebuild_task and not self._rebuild_task.done():
+            return  # The running task picks the request up when it finishes
+        self._rebuild_task = asyncio.create_task(self._run_rebuilds())
+
+    def _maybe_compact(self):
+        """Queue a rebuild once dead ids exceed VECTOR_REBUILD_DEAD_RATIO of the index.
+
+        Below that, the dead ids just stay masked out of searches by the id bitmap.
+        """
+        if self.index and len(self._dead_ids) > VECTOR_REBUILD_DEAD_RATIO * self.index.ntotal:
+            self._schedule_rebuild()
+
+    async def _run_rebuilds(self):
+        try:
+            while self._rebuild_pending is not None:
+                kind, self._rebuild_pending = self._rebuild_pending or None, None
+                current = self._index_kind(self.index)
+                if (kind or current) == current and not self._dead_ids:
+                    continue  # Already satisfied by an earlier rebuild
+                if kind:
+                    print(f"Migrating vector index {current} -> {kind} "
+                          f"({self.index.ntotal} vectors)...")
+                await self._rebuild_shadow(kind=kind)
                 await self._save_index()
-            
-            elapsed = time.time() - start_time
-            print(f"Added {len(texts)} documents in {elapsed:.2f}s")
-            
         except Exception as e:
-            print(f"Error adding documents: {e}")
+            print(f"Error rebuilding vector index: {e}")
+
+    async def _rebuild_shadow(self, kind: Optional[str] = None,
+                              dimension: Optional[int] = None):
+        """Build a replacement index off to the side, then swap it in.
+
+        The shadow is built from a snapshot of `document_map` without holding the
+        lock, so searches carry on against the current generation. Adds and
+        removals made meanwhile are journaled and replayed onto the shadow under
+        the write lock, which waits for in-flight searches to finish on the old
+        index; the swap then bumps `generation`.
+        """
+        async with self._rebuild_mutex:
+            async with self._lock.read():
+                kind = kind or self._index_kind(self.index)
+                dimension = dimension or self.dimension
+                items = sorted(self.document_map.items())
+                self._rebuild_journal = []
+
+            try:
+                ids, vectors = await self._collect_vectors(items, dimension)
+
+                if len(ids) < self._min_train_size(kind):
+                    fallback = self.UNQUANTIZED_KINDS.get(kind, kind)
+                    if len(ids) < self._min_train_size(fallback):
+                        fallback = "flat"
+                    print(f"Not enough vectors to train a {kind} index; using {fallback}")
+                    kind = fallback
+
+                loop = asyncio.get_event_loop()
+                shadow = await loop.run_in_executor(
+                    None, self._build_index, kind, dimension, ids, vectors
+                )
+
+                async with self._lock.write():
+                    await loop.run_in_executor(
+                        None, self._apply_journal, shadow, self._rebuild_journal
+                    )
+                    self.index = shadow
+                    self._index_mapped = False
+                    self.dimension = dimension
+                    self.generation += 1
+                    # Only ids removed from an HNSW/IVF shadow during the build remain
+                    present = set(faiss.vector_to_array(shadow.id_map).tolist())
+                    self._dead_ids = present.difference(self.document_map)
+                    self._filter_cache.clear()
+            finally:
+                self._rebuild_journal = None
+
+        self._maybe_compact()
+
+    def _apply_journal(self, index: "faiss.Index", journal: List):
+        """Replay changes recorded during a shadow build onto it (worker thread)."""
+        can_remove = self._index_kind(index) in self.REMOVABLE_KINDS
+        for op, ids, vectors in journal:
+            if op == DeltaLog.ADD:
+                if vectors.shape[1] == index.d:
+                    index.add_with_ids(vectors, ids)
+            elif can_remove:
+                index.remove_ids(ids)
 
     async def add_chunks(self, chunks: List[str], document_id: int, 
                         chunk_metadata: List[Dict] = None):
@@ -220,45 +1350,127 @@ class VectorStore:
         await self.add_documents(chunks, chunk_metadata)
 
     async def search(self, query: str, k: int = MAX_RETRIEVED_CHUNKS, 
-                    threshold: float = 0.1) -> List[Tuple[str, float, Dict]]:
-        """Search for similar documents"""
+                    threshold: float = 0.1, filters: Optional[Dict] = None,
+                    hierarchical: bool = False) -> List[Tuple[str, float, Dict]]:
+        """Search for similar documents.
+
+        `filters` restricts results by metadata, e.g. {"doc_type": "bookmark"} or
+        {"source_name": ["workspace", "obsidian"]}; see FILTERABLE_FIELDS.
+        `hierarchical` enables two-stage search on large corpora (see `search_many`).
+        """
+        return (await self.search_many([query], k=k, threshold=threshold, filters=filters,
+                                       hierarchical=hierarchical))[0]
+
+    async def search_many(self, queries: List[str], k: int = MAX_RETRIEVED_CHUNKS,
+                          threshold: float = 0.1, filters: Optional[Dict] = None,
+                          hierarchical: bool = False) -> List[List[Tuple[str, float, Dict]]]:
+        """Search for several queries at once.
+
+        All queries are embedded in one batch and searched with a single FAISS call
+        over the stacked matrix. Returns one result list per query, in order, with
+        the same filtering as `search`. Metadata `filters` are applied inside the
+        FAISS search through an id bitmap, so they do not shrink the result set.
+
+        With `hierarchical`, corpora above VECTOR_DOC_INDEX_THRESHOLD chunks are
+        searched in two stages: the VECTOR_DOC_CANDIDATES documents with the closest
+        centroids are picked first, then only their chunks are searched. Explicit
+        `filters` already narrow the scan and turn this off.
+        """
         await self.initialize()
         
-        if self.index.ntotal == 0:
+        if not queries:
             return []
+        if self.index.ntotal == 0:
+            return [[] for _ in queries]
         
         start_time = time.time()
         
         try:
-            # Generate query embedding
-            query_embedding = await embedding_manager.encode_text([query])
-            q_norm = np.linalg.norm(query_embedding)
-            if q_norm == 0:
-                print("Warning: zero-norm query embedding; returning no results")
-                return []
-            query_embedding = query_embedding / q_norm
-            
-            # Search in FAISS index
-            loop = asyncio.get_event_loop()
-            similarities, indices = await loop.run_in_executor(
-                None, 
-                self.index.search, 
-                query_embedding.astype(np.float32), 
-                min(k, self.index.ntotal)
+            # Generate query embeddings in one batch
+            query_embeddings = await embedding_manager.encode_text(
+                list(queries), priority=INTERACTIVE
             )
+            zero_rows = np.linalg.norm(query_embeddings, axis=1) == 0
+            if np.any(zero_rows):
+                print(f"Warning: {int(np.sum(zero_rows))} zero-norm query embedding(s); "
+                      "returning no results for those")
+            query_embeddings = self._normalize(query_embeddings)
             
-            # Filter results by threshold and prepare response
-            results = []
-            for sim, idx in zip(similarities[0], indices[0]):
-                if sim >= threshold and idx in self.document_map:
-                    doc_info = self.document_map[idx]
-                    if self._is_missing_file_url(doc_info.get("metadata", {})):
-                        continue
-                    results.append((
-                        doc_info['text'],
-                        float(sim),
-                        doc_info['metadata']
-                    ))
+            # Everything from the FAISS call to the final map lookups sees one
+            # snapshot: writers wait, other searches run alongside
+            async with self._lock.read():
+                if self.index.ntotal == 0:
+                    return [[] for _ in queries]
+                
+                # Compressed indexes over-fetch, then re-rank with exact vectors
+                rerank = (VECTOR_RERANK_FACTOR > 1
+                          and self._index_kind(self.index) in self.COMPRESSED_KINDS)
+                fetch_k = min(k * VECTOR_RERANK_FACTOR if rerank else k, self.index.ntotal)
+                
+                # Two-stage search: restrict the chunk search to candidate documents
+                cache_mask = True
+                if hierarchical and not filters:
+                    self._schedule_centroid_refresh()
+                    candidates = self._candidate_documents(query_embeddings[~zero_rows])
+                    if candidates is not None:
+                        filters, cache_mask = {'document_id': candidates}, False
+                
+                # Metadata filters and hidden ids become an id selector evaluated inside the search
+                mask = params = None
+                if filters or self._tombstones or self._dead_ids:
+                    mask, _, selector = self._filter_mask(filters or {}, cache=cache_mask)
+                    matching = int(np.count_nonzero(mask))
+                    if matching == 0:
+                        return [[] for _ in queries]
+                    fetch_k = min(fetch_k, matching)
+                    params = self._search_params(selector)
+                    if params is None:
+                        # No selector support: over-fetch in proportion to the selectivity
+                        fetch_k = min(fetch_k * -(-self.index.ntotal // matching), self.index.ntotal)
+                
+                # Search in FAISS index
+                loop = asyncio.get_event_loop()
+                similarities, indices = await loop.run_in_executor(
+                    None, 
+                    lambda: self.index.search(query_embeddings, fetch_k, params=params)
+                )
+                
+                hits_per_query = [
+                    [] if zero_rows[q] else [
+                        (float(sim), idx)
+                        for sim, idx in zip(similarities[q], indices[q].tolist())
+                        if idx in self.document_map and (mask is None or mask[idx])
+                    ]
+                    for q in range(len(queries))
+                ]
+                if rerank:
+                    hits_per_query = await self._rerank_exact(query_embeddings, hits_per_query)
+                
+                # Filter results by threshold
+                selected_per_query = []
+                for hits in hits_per_query:
+                    selected = []
+                    for sim, idx in hits:
+                        if sim >= threshold:
+                            doc_info = self.document_map[idx]
+                            if self._is_missing_file_url(doc_info.get("metadata", {})):
+                                continue
+                            selected.append((sim, idx))
+                            if len(selected) == k:
+                                break
+                    selected_per_query.append(selected)
+                
+                # Fetch chunk text for the final hits only
+                texts = await self._vector_texts(sorted({
+                    idx for selected in selected_per_query for _, idx in selected
+                }))
+                results = [
+                    [
+                        (texts.get(idx, ''), sim, self.document_map[idx]['metadata'])
+                        for sim, idx in selected
+                    ]
+                    for selected in selected_per_query
+                ]
             
             elapsed = time.time() - start_time
             if elapsed > TIMEOUTS["vector_search"]:
@@ -268,100 +1480,207 @@ class VectorStore:
             
         except Exception as e:
             print(f"Error searching vectors: {e}")
-            return []
+            return [[] for _ in queries]
+
+    async def get_stored_vectors(self, metadata: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Persisted float vectors for search results, without calling the model.
+
+        Returns (vectors, found): one row per metadata entry; rows for chunks without
+        a stored vector are zero and `found` is False for them.
+        """
+        vectors = np.zeros((len(metadata), self.dimension), dtype=np.float32)
+        found = np.zeros(len(metadata), dtype=bool)
+        chunk_ids = [meta.get('chunk_id') for meta in metadata]
+        try:
+            stored = await db.get_chunk_embeddings(
+                [c for c in set(chunk_ids) if c is not None]
+            )
+        except Exception as e:
+            print(f"Warning: could not read stored vectors: {e}")
+            return vectors, found
+
+        for row, chunk_id in enumerate(chunk_ids):
+            blob = stored.get(chunk_id)
+            if blob is not None and len(blob) == self.dimension * 2:
+                vectors[row] = np.frombuffer(blob, dtype=np.float16)
+                found[row] = True
+        return vectors, found
+
+    async def _rerank_exact(self, queries: np.ndarray,
+                            hits_per_query: List[List[Tuple[float, int]]]
+                            ) -> List[List[Tuple[float, int]]]:
+        """Re-score approximate hits against persisted float vectors, best first.
+
+        One database read covers every query. Hits without a stored vector keep
+        their approximate score.
+        """
+        hit_ids = sorted({idx for hits in hits_per_query for _, idx in hits})
+        stored, found = await self.get_stored_vectors(
+            [self.document_map[idx]['metadata'] for idx in hit_ids]
+        )
+        vectors = {idx: stored[row] for row, idx in enumerate(hit_ids) if found[row]}
+
+        reranked = []
+        for query, hits in zip(queries, hits_per_query):
+            rescored = [
+                (float(np.dot(vectors[idx], query)) if idx in vectors else sim, idx)
+                for sim, idx in hits
+            ]
+            rescored.sort(key=lambda hit: hit[0], reverse=True)
+            reranked.append(rescored)
+        return reranked
 
     async def search_by_document_id(self, document_id: int, 
                                    k: int = MAX_RETRIEVED_CHUNKS) -> List[Tuple[str, Dict]]:
         """Get chunks for a specific document"""
         await self.initialize()
         
-        results = []
-        for idx, doc_info in self.document_map.items():
-            meta = doc_info['metadata']
-            if meta.get('document_id') == document_id:
-                results.append((doc_info['text'], meta))
-        
-        # Sort by chunk_index if available
-        results.sort(key=lambda x: x[1].get('chunk_index', 0))
-        return results[:k]
+        async with self._lock.read():
+            matches = [
+                (idx, ref)
+                for idx in self._field_ids['document_id'].get(document_id, ())
+                for ref in self._refs(self.document_map[idx]['metadata'])
+                if ref.get('document_id') == document_id
+            ]
+            
+            # Sort by chunk_index if available
+            matches.sort(key=lambda x: x[1].get('chunk_index', 0))
+            matches = matches[:k]
+            
+            texts = await self._vector_texts([idx for idx, _ in matches])
+        return [(texts.get(idx, ''), meta) for idx, meta in matches]
 
     async def _save_index(self):
-        """Save FAISS index and document map to disk"""
+        """Checkpoint: write the full FAISS index, then drop the delta records it covers.
+
+        The document map is written to the database as it changes. Saves from the
+        checkpoint task, rebuilds and cleanup queue up behind each other, so an
+        older snapshot never overwrites a newer one halfway.
+        """
         if not self.index:
             return
         
         try:
-            # Ensure directory exists
-            Path(self.index_path).parent.mkdir(parents=True, exist_ok=True)
+            async with self._save_mutex:
+                # Ensure directory exists
+                Path(self.index_path).parent.mkdir(parents=True, exist_ok=True)
+                
+                index_file = f"{self.index_path}.index"
+                loop = asyncio.get_event_loop()
+                
+                # Snapshot under a read lock (searches go on, writers wait); the slow
+                # disk write happens without the lock
+                async with self._lock.read():
+                    log_offset = self._delta.tell()
+                    data = await loop.run_in_executor(None, faiss.serialize_index, self.index)
+                    ntotal = self.index.ntotal
+                
+                await loop.run_in_executor(None, self._write_atomic, index_file, data)
+                
+                async with self._lock.write():
+                    self._delta.truncate_before(log_offset)
             
-            index_file = f"{self.index_path}.index"
-            map_file = f"{self.index_path}.map.json"
-            
-            # Save index
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None, faiss.write_index, self.index, index_file
-            )
-            
-            # Save document map
-            with open(map_file, 'w', encoding='utf-8') as f:
-                json.dump({str(k): v for k, v in self.document_map.items()}, f, ensure_ascii=False, indent=2)
-            
-            print(f"Saved vector index with {self.index.ntotal} vectors")
+            print(f"Saved vector index with {ntotal} vectors")
             
         except Exception as e:
             print(f"Error saving index: {e}")
 
+    @staticmethod
+    def _write_atomic(path: str, data: np.ndarray):
+        """Write via a temp file + rename so a crash never leaves a torn index."""
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=os.path.dirname(path) or "."
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                data.tofile(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _schedule_checkpoint(self):
+        """Start a background checkpoint once enough changes are in the delta log."""
+        if self._delta.pending < VECTOR_CHECKPOINT_INTERVAL:
+            return
+        if self._checkpoint_task and not self._checkpoint_task.done():
+            return
+        self._checkpoint_task = asyncio.create_task(self._save_index())
+
     async def get_stats(self) -> Dict:
         """Get vector store statistics"""
         await self.initialize()
         
+        kind = self._index_kind(self.index) if self.index else None
+        total = self.index.ntotal if self.index else 0
         return {
-            'total_vectors': self.index.ntotal if self.index else 0,
+            'total_vectors': total,
             'dimension': self.dimension,
+            'index_type': kind,
+            'index_mmapped': self._index_mapped,
+            'generation': self.generation,
+            'centroid_documents': self._centroid_index.ntotal if self._centroid_index else 0,
+            'rebuilding': bool(self._rebuild_task and not self._rebuild_task.done()),
+            'tombstoned_vectors': len(self._tombstones),
+            'prune_progress': self.prune_progress,
+            'index_memory_mb': total * self._bytes_per_vector(kind, self.dimension) / 1024 / 1024
+                               if kind else 0,
+            'flat_memory_mb': total * self._bytes_per_vector("flat", self.dimension) / 1024 / 1024,
             'index_size_mb': os.path.getsize(f"{self.index_path}.index") / 1024 / 1024 
                            if os.path.exists(f"{self.index_path}.index") else 0,
-            'documents_count': len(set(
-                doc['metadata'].get('document_id', -1) 
-                for doc in self.document_map.values()
-            )) if self.document_map else 0
+            'documents_count': len(self._field_ids['document_id']),
+            'shared_chunks': sum(
+                len(doc['metadata'].get('refs', ())) for doc in self.document_map.values()
+            ),
         }
 
     async def remove_document(self, document_id: int):
-        """Remove all chunks for a document (rebuilds index)"""
+        """Remove all chunks for a document in place (no re-embedding).
+
+        Vectors shared with other documents stay; only this document's references
+        are dropped from them.
+        """
         await self.initialize()
         
-        # Find indices to remove
-        indices_to_remove = []
-        for idx, doc_info in self.document_map.items():
-            if doc_info['metadata'].get('document_id') == document_id:
-                indices_to_remove.append(idx)
-        
-        if not indices_to_remove:
-            return
-        
-        # Rebuild index without removed documents
-        remaining_texts = []
-        remaining_metadata = []
-        
-        for idx, doc_info in self.document_map.items():
-            if idx not in indices_to_remove:
-                remaining_texts.append(doc_info['text'])
-                remaining_metadata.append(doc_info['metadata'])
-        
-        # Recreate index
-        await self._create_new_index()
-        
-        if remaining_texts:
-            await self.add_documents(remaining_texts, remaining_metadata)
-        
-        await self._save_index()
-        print(f"Removed document {document_id} and rebuilt index")
+        async with self._lock.write():
+            ids_to_remove = []
+            updated = {}
+            for idx in list(self._field_ids['document_id'].get(document_id, ())):
+                refs = [
+                    ref for ref in self._refs(self.document_map[idx]['metadata'])
+                    if ref.get('document_id') != document_id
+                ]
+                if not refs:
+                    ids_to_remove.append(idx)
+                    continue
+                
+                # Promote the next reference to be the vector's own metadata
+                updated[idx] = self._set_refs(idx, refs)
+            
+            if not ids_to_remove and not updated:
+                return
+            
+            removed = await self._remove_ids(ids_to_remove)
+            self._queue_map_write(self._save_refs(updated))
+        await self._flush_map_writes()
+        self._schedule_checkpoint()
+        self._schedule_centroid_refresh()
+        shared = f", {len(updated)} shared vector(s) kept" if updated else ""
+        print(f"Removed document {document_id} ({removed} vectors{shared})")
 
     async def cleanup(self):
         """Save index on cleanup"""
+        await self.cancel_prune()
+        if self._centroid_task and not self._centroid_task.done():
+            self._centroid_task.cancel()
+        if self._rebuild_task and not self._rebuild_task.done():
+            await self._rebuild_task
+        if self._checkpoint_task and not self._checkpoint_task.done():
+            await self._checkpoint_task
+        await self._flush_map_writes()
         if self.index:
             await self._save_index()
+        self._delta.close()
 
 # Global vector store instance
 vector_store = VectorStore()
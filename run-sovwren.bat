@@ -77,6 +77,6 @@ REM Launch IDE
 echo.
 echo Launching Sovwren IDE...
 echo.
-python -B sovwren_ide.py
+python -B sovwren_ide.py %*
 
 endlocal
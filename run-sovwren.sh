@@ -101,10 +101,10 @@ run_ide() {
         source venv/bin/activate 2>/dev/null || source venv/Scripts/activate 2>/dev/null
     fi
 
-    $PYTHON_CMD -B sovwren_ide.py
+    $PYTHON_CMD -B sovwren_ide.py "$@"
 }
 
 # Main
 install_deps
 check_lmstudio
-run_ide
+run_ide "$@"
@@ -1,7 +1,6 @@
 """Web scraping functionality using BeautifulSoup"""
 import asyncio
 import aiohttp
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import re
 from typing import Dict, List, Optional, Tuple
@@ -11,8 +10,11 @@ import socket
 import os
 
 from config import TIMEOUTS
+from core.lazy_loader import LazyModule
 from rag.retriever import rag_retriever
 
+bs4 = LazyModule("bs4")  # Imported on the first scrape
+
 class WebScraper:
     def __init__(self):
         self.session = None
@@ -141,7 +143,7 @@ class WebScraper:
 
     def _extract_content(self, html: str, url: str) -> Dict[str, str]:
         """Extract clean content from HTML"""
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = bs4.BeautifulSoup(html, 'html.parser')
         
         # Remove script and style elements
         for script in soup(["script", "style", "nav", "footer", "header", "aside"]):
@@ -203,7 +205,7 @@ class WebScraper:
         
         return text.strip()
 
-    def _extract_metadata(self, soup: BeautifulSoup, url: str) -> Dict[str, str]:
+    def _extract_metadata(self, soup: "bs4.BeautifulSoup", url: str) -> Dict[str, str]:
         """Extract metadata from HTML"""
         metadata = {
             'url': url,
@@ -295,7 +297,7 @@ class WebScraper:
 
     def extract_links(self, html: str, base_url: str) -> List[str]:
         """Extract links from HTML content"""
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = bs4.BeautifulSoup(html, 'html.parser')
         links = []
         
         for link in soup.find_all('a', href=True):
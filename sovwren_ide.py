@@ -6,9 +6,19 @@ Connects to LM Studio / Ollama for local model inference.
 
 Usage:
     pip install textual
-    python sovwren_ide.py
+    python sovwren_ide.py [--profile-startup]
+
+--profile-startup prints import and initialization-phase times after the IDE
+exits (recording stops once startup completes).
 """
 
+import sys
+
+# Enabled before anything else is imported so the report covers every import
+from core.startup_profile import startup_profiler
+if "--profile-startup" in sys.argv:
+    startup_profiler.enable()
+
 from textual.app import App, ComposeResult
 from textual.containers import Container, Horizontal, Vertical, ScrollableContainer
 from textual.widgets import Header, Footer, Static, Input, Button, DirectoryTree, Label, Switch, TextArea, TabbedContent, TabPane, Collapsible, OptionList, Select
@@ -19,7 +29,6 @@ from textual.message import Message
 from textual import events
 import asyncio
 import os
-import sys
 import time
 import uuid
 import shutil
@@ -1006,6 +1015,7 @@ class BottomDock(Vertical):
                 yield Static("", id="monitor-model")
                 yield Static("", id="monitor-request")
                 yield Static("", id="monitor-context")
+                yield Static("", id="monitor-embeddings")
 
                 yield Label("[b]System[/b]", classes="panel-header panel-header-spaced")
                 yield Static("", id="monitor-system")
@@ -2665,15 +2675,20 @@ class SovwrenIDE(App):
         self.set_interval(5.0, self._check_idle_state)
         self.set_interval(1.0, self._update_monitor_panel)
 
+        # Warm the embedding model while the splash and session picker are up,
+        # so the first RAG query doesn't pay for a cold model load
+        asyncio.create_task(self._warm_up_embeddings())
+
         # Workspace file index (for @mentions in chat)
         self._workspace_file_index: list[str] = []
         self._build_workspace_file_index()
 
         # Initialize database early so we can read profile preference
         try:
-            from core.database import Database
-            self.db = Database()
-            await self.db.initialize()
+            with startup_profiler.phase("database"):
+                from core.database import Database
+                self.db = Database()
+                await self.db.initialize()
         except Exception:
             self.db = None
 
@@ -2900,6 +2915,25 @@ class SovwrenIDE(App):
             except Exception:
                 pass
 
+            try:
+                # Only read the state if RAG is loaded; never import it from a timer
+                embeddings = sys.modules.get("rag.embeddings")
+                manager = getattr(embeddings, "embedding_manager", None)
+                if manager is None:
+                    embed_text = "Embeddings: cold"
+                else:
+                    state = manager.state
+                    if state == "warm" and manager.warm_up_ms is not None:
+                        state = f"warm (ready in {manager.warm_up_ms}ms)"
+                    elif state == "warming":
+                        state = "warming up"
+                    elif state == "failed":
+                        state = "cold (warm-up failed)"
+                    embed_text = f"Embeddings: {state} | {manager.model_name} ({manager.backend})"
+                self.query_one("#monitor-embeddings", Static).update(embed_text)
+            except Exception:
+                pass
+
             # System stats via psutil (optional but expected)
             cpu_text = "CPU: ?"
             ram_text = "RAM: ?"
@@ -3533,26 +3567,35 @@ class SovwrenIDE(App):
 
     async def _complete_startup(self) -> None:
         # Load profile first (before connecting)
-        await self._load_profile(self.current_profile_name)
+        with startup_profiler.phase("profile"):
+            await self._load_profile(self.current_profile_name)
 
         # Try to connect to LM Studio (will use preferred_model if set)
-        await self.connect_to_node()
+        with startup_profiler.phase("LLM connection"):
+            await self.connect_to_node()
 
-        # Initialize RAG system
-        await self._initialize_rag()
+        # Initialize RAG system (the embedding model warms up separately; see on_mount)
+        with startup_profiler.phase("RAG index"):
+            await self._initialize_rag()
 
         # Initialize Search Gate (Friction Class VI)
-        await self._initialize_search_gate()
+        with startup_profiler.phase("search gate"):
+            await self._initialize_search_gate()
 
         # Initialize Council Gate (Friction Class VI extension)
-        await self._initialize_council_gate()
+        with startup_profiler.phase("council gate"):
+            await self._initialize_council_gate()
 
         # Load existing memories into sidebar
-        await self._refresh_memory_display()
+        with startup_profiler.phase("memory display"):
+            await self._refresh_memory_display()
 
         # Scan workspace/.shortcuts/ for quick launchers
         self._scan_shortcuts()
 
+        # Printed after exit: output written while Textual owns the screen is lost
+        startup_profiler.finish()
+
     async def _load_profile(self, profile_name: str) -> None:
         """Load a profile and apply its settings."""
         from config import load_profile, DEFAULT_PROFILE
@@ -5106,6 +5149,16 @@ class SovwrenIDE(App):
             stream.add_message(f"[red]Connection error: {e}[/red]", "error")
             status.update_status(False)
 
+    async def _warm_up_embeddings(self) -> None:
+        """Load the embedding model and run a dummy batch (best-effort; never throws)."""
+        try:
+            from rag.embeddings import embedding_manager
+
+            with startup_profiler.phase("embedding warm-up (background)"):
+                await embedding_manager.start_warm_up()
+        except Exception:
+            pass
+
     async def _initialize_rag(self) -> None:
         """Initialize RAG system and index workspace if needed."""
         stream = self.query_one(NeuralStream)
@@ -6931,3 +6984,4 @@ Output ONLY valid JSON."""
 if __name__ == "__main__":
     app = SovwrenIDE()
     app.run()
+    startup_profiler.report()
@@ -0,0 +1,171 @@
+"""Benchmark ways of running scheduler batches through the embedding model.
+
+Chunks the real corpus the way ingestion does (LocalIngester file selection,
+RAGRetriever._chunk_text), takes scheduler-sized batches (EMBEDDING_BATCH_SIZE)
+in file order, and encodes each batch three ways:
+
+- single: one model call per batch, padded to its longest text
+- plain: `model.encode(batch, batch_size=ENCODE_BATCH_SIZE)` (32), which sorts
+  the batch by length and pads each group of 32 separately
+- bucketed: the batch split into length buckets of varying size (below), one
+  model call per bucket
+
+It reports throughput and how many padding tokens each strategy feeds the model.
+The embedding manager uses plain; bucketing measured within noise of it (1.02x
+on 640 and 757 chunks), so it stays here as the candidate to re-measure, not in rag/.
+
+Usage:
+    python tools/bench_embedding_batching.py [--path DIR] [--limit N] [--repeat 3] [--model NAME]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from config import EMBEDDING_BATCH_SIZE  # noqa: E402
+from rag.embeddings import ENCODE_BATCH_SIZE, embedding_manager, load_model  # noqa: E402
+from rag.local_ingester import LocalIngester  # noqa: E402
+from rag.retriever import rag_retriever  # noqa: E402
+
+
+# Length bucketing: a bucket closes once the next text is more than BUCKET_SPREAD
+# times longer than its shortest text (texts under BUCKET_FLOOR chars count as
+# BUCKET_FLOOR, since short sequences pad cheaply), but never below BUCKET_MIN texts.
+BUCKET_SPREAD = 2.0
+BUCKET_FLOOR = 64
+BUCKET_MIN = 8
+
+
+def length_buckets(texts: list[str], max_batch: int = EMBEDDING_BATCH_SIZE) -> list[np.ndarray]:
+    """Group text indices into batches of similar length (shortest first)"""
+    lengths = np.maximum([len(t) for t in texts], BUCKET_FLOOR)
+    order = np.argsort(lengths, kind="stable")
+    buckets = []
+    start = 0
+    for end in range(1, len(order) + 1):
+        size = end - start
+        if end == len(order) or size >= max_batch or (
+            size >= BUCKET_MIN and lengths[order[end]] > BUCKET_SPREAD * lengths[order[start]]
+        ):
+            buckets.append(order[start:end])
+            start = end
+    return buckets
+
+
+def encode_bucketed(model, texts: list[str]) -> np.ndarray:
+    """Encode texts one length bucket at a time; rows come back in input order"""
+    vectors = None
+    for bucket in length_buckets(texts):
+        encoded = model.encode([texts[i] for i in bucket], convert_to_numpy=True,
+                               batch_size=len(bucket))
+        if vectors is None:
+            vectors = np.empty((len(texts), encoded.shape[1]), dtype=encoded.dtype)
+        vectors[bucket] = encoded
+    return vectors
+
+
+def _collect_chunks(path: Path, limit: int) -> list[str]:
+    ingester = LocalIngester(str(path))
+    ingester._current_source_root = path
+    chunks = []
+    for pattern in ingester.DEFAULT_PATTERNS:
+        for file_path in sorted(path.glob(pattern)):
+            if not file_path.is_file() or ingester._should_exclude(file_path):
+                continue
+            content = file_path.read_text(encoding="utf-8", errors="ignore")
+            if len(content.strip()) < ingester.MIN_CONTENT_LENGTH:
+                continue
+            chunks.extend(rag_retriever._chunk_text(content))
+            if limit and len(chunks) >= limit:
+                return chunks[:limit]
+    return chunks
+
+
+def _padded_tokens(tokenizer, texts, batches) -> tuple[int, int]:
+    """(real tokens, tokens after padding each batch to its longest text)"""
+    lengths = np.array([len(ids) for ids in tokenizer(texts, truncation=True)["input_ids"]])
+    padded = sum(len(batch) * lengths[batch].max() for batch in batches if len(batch))
+    return int(lengths.sum()), int(padded)
+
+
+def _single(model, texts):
+    for i in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        batch = texts[i:i + EMBEDDING_BATCH_SIZE]
+        model.encode(batch, convert_to_numpy=True, batch_size=len(batch))
+
+
+def _plain(model, texts):
+    for i in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        model.encode(texts[i:i + EMBEDDING_BATCH_SIZE], convert_to_numpy=True,
+                     batch_size=ENCODE_BATCH_SIZE)
+
+
+def _bucketed(model, texts):
+    for i in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        encode_bucketed(model, texts[i:i + EMBEDDING_BATCH_SIZE])
+
+
+def _plain_batches(texts, batch):
+    """The groups plain `encode` pads together: longest first, ENCODE_BATCH_SIZE at a time"""
+    order = batch[np.argsort([-len(texts[i]) for i in batch], kind="stable")]
+    return [order[i:i + ENCODE_BATCH_SIZE] for i in range(0, len(order), ENCODE_BATCH_SIZE)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", type=Path, default=ROOT, help="corpus root (default: workspace)")
+    parser.add_argument("--limit", type=int, default=2000, help="max chunks (0 = all)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per strategy (best kept)")
+    parser.add_argument("--model", default=embedding_manager.model_name,
+                        help="model name or local path (default: the configured model)")
+    args = parser.parse_args()
+
+    texts = _collect_chunks(args.path.resolve(), args.limit)
+    if not texts:
+        print(f"No chunks found under {args.path}", file=sys.stderr)
+        return 2
+
+    model, backend = load_model(args.model, "cpu",
+                                embedding_manager.backend, embedding_manager.onnx_file)
+    print(f"Corpus: {args.path} ({len(texts)} chunks)  model: {args.model}  backend: {backend}  "
+          f"batch size: {EMBEDDING_BATCH_SIZE}")
+
+    single_batches = [np.arange(i, min(i + EMBEDDING_BATCH_SIZE, len(texts)))
+                      for i in range(0, len(texts), EMBEDDING_BATCH_SIZE)]
+    plain_batches = [group for batch in single_batches for group in _plain_batches(texts, batch)]
+    bucket_batches = [batch[bucket] for batch in single_batches
+                      for bucket in length_buckets([texts[i] for i in batch])]
+    tokenizer = getattr(model, "tokenizer", None)
+
+    model.encode(texts[:EMBEDDING_BATCH_SIZE], convert_to_numpy=True)  # Warm-up
+    results = {}
+    for name, run, batches in (("single", _single, single_batches),
+                               ("plain", _plain, plain_batches),
+                               ("bucketed", _bucketed, bucket_batches)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run(model, texts)
+            best = min(best, time.perf_counter() - start)
+        results[name] = best
+
+        line = f"{name:>9}: {len(texts) / best:8.1f} texts/s  ({best:.2f}s, {len(batches)} model calls)"
+        if tokenizer is not None:
+            real, padded = _padded_tokens(tokenizer, texts, batches)
+            line += f"  padding {100 * (padded - real) / padded:5.1f}% of {padded} tokens"
+        print(line)
+
+    print(f"Bucketed vs plain: {results['plain'] / results['bucketed']:.2f}x  "
+          f"(vs single: {results['single'] / results['bucketed']:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
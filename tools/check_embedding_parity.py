@@ -0,0 +1,132 @@
+"""Check that the ONNX embedding backend produces vectors compatible with torch.
+
+Encodes a fixed set of sentences with both backends and compares them:
+per-sentence cosine similarity, plus whether each query retrieves the same
+top-k passages. An index built with one backend must stay searchable with the
+other, so both checks have to pass before switching EMBEDDING_BACKEND.
+
+Usage:
+    python tools/check_embedding_parity.py [--onnx-file onnx/model.onnx] [--min-cosine 0.98]
+
+Both models are loaded through rag.embeddings.load_model, the same path the app
+uses. If that silently falls back to torch for the ONNX model, the check fails.
+
+Exit status is 0 on parity, 1 on a mismatch, 2 if a backend can't be loaded.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from config import EMBEDDING_ONNX_FILE  # noqa: E402
+from rag.embeddings import load_model  # noqa: E402
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+PASSAGES = [
+    "The vector store keeps one FAISS index and a JSON metadata map next to it.",
+    "Chunks are split on paragraph boundaries with a small overlap between them.",
+    "Sessions are saved to SQLite so a conversation can be resumed later.",
+    "The scraper fetches a page, strips navigation and keeps the article text.",
+    "Ollama and LM Studio both expose a local HTTP API for chat completions.",
+    "Press Ctrl+S to save the open file in the editor pane.",
+    "Embeddings are cached on disk, keyed by a hash of the model and the text.",
+    "The monitor panel shows memory usage, model status and the active profile.",
+    "HNSW indexes cannot delete vectors, so removals trigger a background rebuild.",
+    "Bread dough should rise until it has roughly doubled in size.",
+    "The migration of arctic terns covers tens of thousands of kilometres a year.",
+    "Rust's borrow checker rejects code with two mutable references to one value.",
+]
+
+QUERIES = [
+    "how are chunks split",
+    "where are conversations stored",
+    "local LLM server API",
+    "keyboard shortcut to save",
+    "why does deleting from HNSW rebuild the index",
+    "how long do birds migrate",
+]
+
+
+def _encode(model, texts):
+    vectors = model.encode(texts, convert_to_numpy=True)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--onnx-file", default=EMBEDDING_ONNX_FILE,
+                        help="ONNX export inside the model repo ('' for onnx/model.onnx)")
+    parser.add_argument("--min-cosine", type=float, default=0.98,
+                        help="lowest acceptable per-sentence cosine similarity")
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    # Load both through the app's own loader, so the checked path is the one used
+    try:
+        torch_model, _ = load_model(MODEL_NAME, "cpu", "torch")
+        onnx_model, backend = load_model(MODEL_NAME, "cpu", "onnx", args.onnx_file)
+    except Exception as e:
+        print(f"Failed to load a backend: {e}", file=sys.stderr)
+        return 2
+    if backend != "onnx":
+        # load_model fell back to torch; comparing torch with itself proves nothing
+        print("FAIL: the ONNX backend did not load (load_model fell back to torch)", file=sys.stderr)
+        print('ONNX needs: pip install "sentence-transformers[onnx]"', file=sys.stderr)
+        return 2
+
+    texts = PASSAGES + QUERIES
+    timings = {}
+    vectors = {}
+    for name, model in (("torch", torch_model), ("onnx", onnx_model)):
+        _encode(model, texts[:2])  # Warm-up
+        start = time.perf_counter()
+        vectors[name] = _encode(model, texts)
+        timings[name] = time.perf_counter() - start
+
+    cosines = np.sum(vectors["torch"] * vectors["onnx"], axis=1)
+    print(f"Model: {MODEL_NAME}  ONNX file: {args.onnx_file or 'onnx/model.onnx'}")
+    print(f"Cosine torch vs onnx: min {cosines.min():.4f}  mean {cosines.mean():.4f}")
+
+    # Retrieval agreement: the top-k passages for each query under both backends
+    k = min(args.top_k, len(PASSAGES))
+    mismatches = 0
+    for qi, query in enumerate(QUERIES):
+        tops = {}
+        for name in ("torch", "onnx"):
+            scores = vectors[name][:len(PASSAGES)] @ vectors[name][len(PASSAGES) + qi]
+            tops[name] = list(np.argsort(-scores)[:k])
+        if tops["torch"] != tops["onnx"]:
+            mismatches += 1
+            print(f"- top-{k} differs for {query!r}: torch {tops['torch']} onnx {tops['onnx']}")
+    print(f"Top-{k} agreement: {len(QUERIES) - mismatches}/{len(QUERIES)} queries")
+    print(f"Encode time ({len(texts)} texts): torch {timings['torch'] * 1000:.1f} ms, "
+          f"onnx {timings['onnx'] * 1000:.1f} ms")
+
+    # Near-ties may swap order within the top-k; the top-1 hit must always match
+    if cosines.min() < args.min_cosine:
+        print(f"FAIL: cosine below {args.min_cosine}", file=sys.stderr)
+        return 1
+    for qi in range(len(QUERIES)):
+        q = len(PASSAGES) + qi
+        top1 = {
+            name: int(np.argmax(vectors[name][:len(PASSAGES)] @ vectors[name][q]))
+            for name in ("torch", "onnx")
+        }
+        if top1["torch"] != top1["onnx"]:
+            print(f"FAIL: top-1 differs for {QUERIES[qi]!r}", file=sys.stderr)
+            return 1
+
+    print("OK: backends are compatible")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,188 @@
+"""Check that removing documents keeps search correct for every vector index kind.
+
+For each kind `_build_index` can produce, a throwaway store (temporary database
+and index files) is filled with deterministic vectors, rebuilt to that kind, and
+then put through remove -> search -> remove -> search, a wait for any background
+rebuild, and a save/reload followed by one more removal. After every step:
+
+- no search returns a vector of a removed document
+- a sample of the remaining texts still find themselves as the top hit
+
+Each kind runs in its own process with SOVWREN_VECTOR_INDEX and
+SOVWREN_VECTOR_QUANTIZATION pinned to it, so background rebuilds keep the kind,
+and a FAISS assertion (which aborts the process) is reported as a failure.
+
+Vectors come from a hash of the text instead of the embedding model, so the
+check needs no model download and expected hits are exact.
+
+Usage:
+    python tools/check_index_removal.py [--kinds flat,hnsw,ivf_flat]
+
+Exit status is 0 when every kind passes and 1 otherwise.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from core.database import db  # noqa: E402
+from rag.embeddings import embedding_manager  # noqa: E402
+from rag.vector_store import VectorStore  # noqa: E402
+
+# kind -> (SOVWREN_VECTOR_INDEX, SOVWREN_VECTOR_QUANTIZATION) that keeps it
+KINDS = {
+    "flat": ("flat", "none"),
+    "sq8": ("flat", "sq8"),
+    "pq": ("flat", "pq"),
+    "hnsw": ("hnsw", "none"),
+    "hnsw_sq8": ("hnsw", "sq8"),
+    "ivf_flat": ("ivf_flat", "none"),
+    "ivf_sq8": ("ivf_flat", "sq8"),
+    "ivf_pq": ("ivf_pq", "none"),
+}
+DIMENSION = 96
+DOCUMENTS = 20
+SAMPLE = 40
+
+
+def fake_vector(text: str) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+    return np.random.RandomState(seed).randn(DIMENSION).astype(np.float32)
+
+
+async def fake_encode(text, batch_size=None, priority=None) -> np.ndarray:
+    texts = [text] if isinstance(text, str) else text
+    return np.stack([fake_vector(t) for t in texts])
+
+
+async def fake_initialize():
+    pass
+
+
+def use_fake_embeddings():
+    embedding_manager.initialize = fake_initialize
+    embedding_manager.encode_text = fake_encode
+    embedding_manager.get_embedding_dimension = lambda: DIMENSION
+
+
+async def check_searches(store: VectorStore, texts: list[str], removed: set[int],
+                         step: str) -> list[str]:
+    failures = []
+    removed_texts = [t for i, t in enumerate(texts) if i % DOCUMENTS in removed][:SAMPLE]
+    kept = [(i, t) for i, t in enumerate(texts) if i % DOCUMENTS not in removed]
+    sample = [kept[j] for j in np.linspace(0, len(kept) - 1, SAMPLE).astype(int)]
+
+    results = await store.search_many(removed_texts + [t for _, t in sample],
+                                      k=5, threshold=-1.0)
+    leaked = sum(
+        1 for hits in results for _, _, meta in hits if meta.get("document_id") in removed
+    )
+    if leaked:
+        failures.append(f"{step}: {leaked} hit(s) from removed documents")
+
+    misses = [
+        text for (_, text), hits in zip(sample, results[len(removed_texts):])
+        if not hits or hits[0][0] != text
+    ]
+    if misses:
+        failures.append(f"{step}: {len(misses)}/{len(sample)} remaining texts did not "
+                        f"find themselves (e.g. {misses[0]!r})")
+    return failures
+
+
+async def check_kind(kind: str, workdir: Path) -> list[str]:
+    index_path = str(workdir / kind)
+    # Enough that the removed documents don't drop the store below training size
+    count = max(VectorStore._min_train_size(kind) * DOCUMENTS // (DOCUMENTS - 3) + DOCUMENTS,
+                1200)
+    texts = [f"{kind} chunk {i}" for i in range(count)]
+    metadata = [{"document_id": i % DOCUMENTS, "chunk_index": i // DOCUMENTS}
+                for i in range(count)]
+
+    store = VectorStore(index_path)
+    await store.add_documents(texts, metadata)
+    await store.rebuild_index(index_type=kind)
+    built = store._index_kind(store.index)
+    if built != kind:
+        await store.cleanup()
+        return [f"rebuild produced {built}"]
+
+    failures = []
+    removed = set()
+    for document_id in (3, 7):
+        await store.remove_document(document_id)
+        removed.add(document_id)
+        failures += await check_searches(store, texts, removed, f"after removing {document_id}")
+
+    if store._rebuild_task:
+        await store._rebuild_task
+    failures += await check_searches(store, texts, removed, "after background rebuild")
+    if store._index_kind(store.index) != kind:
+        failures.append(f"background rebuild changed the index to "
+                        f"{store._index_kind(store.index)}")
+    await store.cleanup()
+
+    store = VectorStore(index_path)
+    await store.initialize()
+    await store.remove_document(11)
+    removed.add(11)
+    failures += await check_searches(store, texts, removed, "after reload and removal")
+    await store.cleanup()
+    return failures
+
+
+async def run_one(kind: str) -> int:
+    use_fake_embeddings()
+    with tempfile.TemporaryDirectory() as tmp:
+        db.db_path = str(Path(tmp) / "check.db")
+        failures = await check_kind(kind, Path(tmp))
+    for failure in failures:
+        print(f"FAIL: {kind}: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kinds", default=",".join(KINDS),
+                        help=f"comma-separated index kinds (default: {','.join(KINDS)})")
+    parser.add_argument("--one", help=argparse.SUPPRESS)  # Child process: check one kind
+    args = parser.parse_args()
+
+    if args.one:
+        return asyncio.run(run_one(args.one))
+
+    failed = []
+    for kind in args.kinds.split(","):
+        if kind not in KINDS:
+            parser.error(f"unknown kind {kind!r}")
+        index_type, quantization = KINDS[kind]
+        env = dict(os.environ, SOVWREN_VECTOR_INDEX=index_type,
+                   SOVWREN_VECTOR_QUANTIZATION=quantization)
+        print(f"checking {kind}...", flush=True)
+        result = subprocess.run([sys.executable, __file__, "--one", kind], env=env,
+                                stdout=subprocess.DEVNULL)
+        if result.returncode:
+            crashed = " (crashed)" if result.returncode < 0 else ""
+            failed.append(kind)
+        print(f"  {kind}: {'FAIL' + crashed if result.returncode else 'ok'}", flush=True)
+
+    if failed:
+        print(f"FAIL: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    print("OK: removal keeps search correct for every index kind")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
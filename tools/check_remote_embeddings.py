@@ -0,0 +1,195 @@
+"""Check the remote embedding backend against a fake local embedding server.
+
+Starts an aiohttp server on a free localhost port. It speaks both Ollama's
+/api/embed and LM Studio's OpenAI-style /v1/embeddings, and returns
+deterministic vectors, so no real model is needed. The check then runs
+EmbeddingManager with backend="remote" against each provider and verifies:
+
+- vectors come back in input order with the probed dimension
+- texts are batched (one request per EMBEDDING_REMOTE_BATCH texts)
+- requests reuse pooled connections (no more than EMBEDDING_REMOTE_CONNECTIONS)
+- an unreachable server, a timeout and a non-object response all raise
+  RemoteEmbeddingError (which the manager turns into a fallback to torch)
+
+Usage:
+    python tools/check_remote_embeddings.py
+
+Exit status is 0 when every check passes and 1 otherwise.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import sys
+from pathlib import Path
+
+import numpy as np
+from aiohttp import web
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from config import EMBEDDING_REMOTE_BATCH, EMBEDDING_REMOTE_CONNECTIONS  # noqa: E402
+from rag.embeddings import EmbeddingManager  # noqa: E402
+from rag.remote_embeddings import RemoteEmbeddingClient, RemoteEmbeddingError  # noqa: E402
+
+DIMENSION = 384
+
+
+def fake_vector(text: str) -> list[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+    return np.random.RandomState(seed).randn(DIMENSION).astype(np.float32).tolist()
+
+
+class FakeServer:
+    def __init__(self):
+        self.requests = 0
+        self.texts = 0
+        self.peers = set()
+        self.runner = None
+        self.port = None
+        self.mode = "ok"  # "slow" never answers in time, "list" returns a JSON array
+
+    def _record(self, request: web.Request, texts: list[str]):
+        self.requests += 1
+        self.texts += len(texts)
+        self.peers.add(request.transport.get_extra_info("peername"))
+
+    async def ollama(self, request: web.Request) -> web.Response:
+        if self.mode == "slow":
+            await asyncio.sleep(2)
+            return web.json_response({})
+        elif self.mode == "list":
+            return web.json_response([[0.0] * DIMENSION])
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        self._record(request, texts)
+        return web.json_response({"model": body["model"],
+                                  "embeddings": [fake_vector(t) for t in texts]})
+
+    async def lmstudio(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        self._record(request, texts)
+        # Shuffled on purpose: clients must order by "index"
+        data = [{"object": "embedding", "index": i, "embedding": fake_vector(t)}
+                for i, t in enumerate(texts)][::-1]
+        return web.json_response({"object": "list", "data": data, "model": body["model"]})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/api/embed", self.ollama)
+        app.router.add_post("/v1/embeddings", self.lmstudio)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def reset(self):
+        self.requests = 0
+        self.texts = 0
+        self.peers.clear()
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+async def check_provider(server: FakeServer, provider: str, base_url: str) -> list[str]:
+    failures = []
+    manager = EmbeddingManager(backend="remote")
+    manager._disk_cache = None
+    manager.remote_provider = provider
+    manager.remote_url = base_url
+    server.reset()
+
+    await manager.initialize()
+    if manager.backend != "remote" or manager.get_embedding_dimension() != DIMENSION:
+        failures.append(f"{provider}: did not connect (backend {manager.backend}, "
+                        f"dimension {manager.get_embedding_dimension()})")
+        return failures
+
+    texts = [f"{provider} passage {i} " * (i % 7 + 1) for i in range(200)]
+    server.reset()
+    results = await asyncio.gather(
+        *(manager.encode_text(texts[i:i + 25]) for i in range(0, len(texts), 25))
+    )
+    vectors = np.concatenate(results)
+    expected = np.array([fake_vector(t) for t in texts], dtype=np.float32)
+    if vectors.shape != expected.shape or not np.allclose(vectors, expected):
+        failures.append(f"{provider}: vectors out of order or wrong")
+
+    batches = manager.get_cache_stats()["scheduler"]["batches"]
+    print(f"{provider:>8}: {len(texts)} texts in {batches} scheduler batches, "
+          f"{server.requests} HTTP requests over {len(server.peers)} connections")
+    if server.texts != len(texts):
+        failures.append(f"{provider}: server embedded {server.texts} texts, expected {len(texts)}")
+    if server.requests > -(-len(texts) // EMBEDDING_REMOTE_BATCH) + batches:
+        failures.append(f"{provider}: requests were not batched ({server.requests} requests)")
+    if len(server.peers) > EMBEDDING_REMOTE_CONNECTIONS:
+        failures.append(f"{provider}: {len(server.peers)} connections exceed the pool limit")
+
+    # Cached texts never reach the server again
+    server.reset()
+    await manager.encode_text(texts[:10])
+    if server.requests:
+        failures.append(f"{provider}: cached texts were re-requested")
+
+    await manager.shutdown()
+    return failures
+
+
+async def check_unreachable() -> list[str]:
+    failures = []
+    client = RemoteEmbeddingClient("ollama", "all-minilm", "http://127.0.0.1:9")
+    try:
+        await client.connect()
+        failures.append("unreachable server: connect() did not raise")
+    except RemoteEmbeddingError as e:
+        print(f"unreachable: {e}")
+    finally:
+        await client.close()
+    return failures
+
+
+async def check_bad_server(server: FakeServer) -> list[str]:
+    failures = []
+    for mode in ("slow", "list"):
+        server.mode = mode
+        client = RemoteEmbeddingClient("ollama", "all-minilm", f"http://127.0.0.1:{server.port}",
+                                       timeout=0.5)
+        try:
+            await client.connect()
+            failures.append(f"{mode} server: connect() did not raise")
+        except RemoteEmbeddingError as e:
+            print(f"{mode:>11}: {e}")
+        except Exception as e:
+            failures.append(f"{mode} server: raised {type(e).__name__} instead of RemoteEmbeddingError")
+        finally:
+            await client.close()
+    server.mode = "ok"
+    return failures
+
+
+async def main() -> int:
+    server = FakeServer()
+    await server.start()
+    try:
+        failures = []
+        failures += await check_provider(server, "ollama", f"http://127.0.0.1:{server.port}")
+        failures += await check_provider(server, "lmstudio", f"http://127.0.0.1:{server.port}/v1")
+        failures += await check_unreachable()
+        failures += await check_bad_server(server)
+    finally:
+        await server.stop()
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+        return 1
+    print("OK: remote embedding backend")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
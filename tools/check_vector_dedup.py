@@ -0,0 +1,130 @@
+"""Check that chunks deduplicated by content hash keep their stored vectors.
+
+Throwaway stores (temporary database and index files) are put through:
+
+- re-ingesting a url, the way a background reindex does: the model is not called
+  for unchanged chunks, every chunk the store points at keeps a stored vector
+  (`get_stored_vectors`), and `rebuild_index()` runs without calling the model
+- removing a document while another one that shares its content is being
+  embedded: the second document still ends up with all of its chunks
+
+Vectors come from a hash of the text instead of the embedding model (see
+check_index_removal.py), so the check needs no model download.
+
+Usage:
+    python tools/check_vector_dedup.py
+
+Exit status is 0 when every check passes and 1 otherwise.
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from check_index_removal import fake_encode, use_fake_embeddings  # noqa: E402
+from core.database import db  # noqa: E402
+from rag.embeddings import embedding_manager  # noqa: E402
+from rag.vector_store import VectorStore  # noqa: E402
+
+TEXTS = [f"paragraph {i} of the dedup check" for i in range(6)]
+URL = "https://example.invalid/dedup-check"
+
+encoded = []  # Texts passed to the (fake) model
+
+
+async def counting_encode(text, batch_size=None, priority=None) -> np.ndarray:
+    encoded.extend([text] if isinstance(text, str) else text)
+    return await fake_encode(text, batch_size, priority)
+
+
+async def ingest(store: VectorStore, url: str, texts: list[str]) -> int:
+    """Store a document and its chunks like `RAGRetriever.add_document`."""
+    document_id = await db.add_document(url=url, title="dedup check", content="\n".join(texts))
+    metadata = []
+    for i, text in enumerate(texts):
+        chunk_id = await db.add_document_chunk(document_id, text, i)
+        metadata.append({'chunk_index': i, 'chunk_id': chunk_id, 'url': url})
+    await store.add_chunks(texts, document_id, metadata)
+    return document_id
+
+
+async def check_reingest(workdir: Path) -> list[str]:
+    failures = []
+    store = VectorStore(str(workdir / "reingest"))
+    await ingest(store, URL, TEXTS)
+    before = len(encoded)
+
+    document_id = await ingest(store, URL, TEXTS)
+    if len(encoded) != before:
+        failures.append(f"re-ingest embedded {len(encoded) - before} unchanged chunk(s)")
+
+    metas = [doc['metadata'] for doc in store.document_map.values()]
+    if any(meta.get('document_id') != document_id for meta in metas):
+        failures.append("re-ingested document did not become the primary reference")
+    _, found = await store.get_stored_vectors(metas)
+    if not found.all():
+        failures.append(f"{int((~found).sum())}/{len(found)} chunk(s) lost their stored vector")
+
+    before = len(encoded)
+    await store.rebuild_index()
+    if len(encoded) != before:
+        failures.append(f"rebuild after re-ingest embedded {len(encoded) - before} chunk(s)")
+    await store.cleanup()
+    return failures
+
+
+async def check_removed_while_embedding(workdir: Path) -> list[str]:
+    store = VectorStore(str(workdir / "race"))
+    first = await ingest(store, URL, ["shared paragraph"])
+
+    # Slow the model down so the removal lands while the second add is embedding
+    embedding_manager.encode_text = slow_encode
+    try:
+        adding = asyncio.create_task(
+            ingest(store, f"{URL}-renamed", ["shared paragraph", "new paragraph"])
+        )
+        await asyncio.sleep(0.2)
+        await store.remove_document(first)
+        second = await adding
+    finally:
+        embedding_manager.encode_text = counting_encode
+
+    failures = []
+    indexed = sorted(ref.get('chunk_index') for doc in store.document_map.values()
+                     for ref in store._refs(doc['metadata']) if ref.get('document_id') == second)
+    if indexed != [0, 1]:
+        failures.append(f"document added during a removal has chunks {indexed}, expected [0, 1]")
+    await store.cleanup()
+    return failures
+
+
+async def slow_encode(text, batch_size=None, priority=None) -> np.ndarray:
+    await asyncio.sleep(0.5)
+    return await counting_encode(text, batch_size, priority)
+
+
+async def run() -> int:
+    use_fake_embeddings()
+    embedding_manager.encode_text = counting_encode
+    with tempfile.TemporaryDirectory() as tmp:
+        db.db_path = str(Path(tmp) / "check.db")
+        await db.initialize()
+        failures = await check_reingest(Path(tmp))
+        failures += await check_removed_while_embedding(Path(tmp))
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if failures:
+        return 1
+    print("OK: deduplicated chunks survive re-ingest and concurrent removal")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(run()))